@@ -0,0 +1,84 @@
+"""
+Home & Verse - JSON Serialization Benchmark
+============================================
+Compares the default FastAPI return path (jsonable_encoder + JSONResponse)
+with FastJSONResponse for typical catalog payloads.
+
+Usage:
+    cd backend
+    python3 bench_json.py [repeats]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+import fast_json
+from catalog import CatalogStore
+from fast_json import FastJSONResponse
+
+DATA_DIR = Path("data")
+
+
+def default_path(content) -> bytes:
+    """What FastAPI does with a returned dict"""
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def no_encoder_path(content) -> bytes:
+    """Stdlib JSONResponse, skipping jsonable_encoder"""
+    return JSONResponse(content).body
+
+
+def fast_path(content) -> bytes:
+    return FastJSONResponse(content).body
+
+
+def timed(fn, content, repeats: int) -> float:
+    """Best wall time (ms) over `repeats` runs"""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(content)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def payloads(snapshot) -> dict:
+    everything = snapshot.skus_sorted("popularity", snapshot.indexes.all_skus)
+    page = everything[:48]
+    return {
+        "all products": {"products": snapshot.products_ranked(everything), "count": len(everything)},
+        "listing page (48)": {"products": snapshot.products_ranked(page), "count": len(everything)},
+        "single product": snapshot.product(page[0]),
+        "brands": snapshot.aggregates.brands,
+    }
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    snapshot = CatalogStore(
+        DATA_DIR / "products.json", DATA_DIR / "stock.json",
+        DATA_DIR / "rankings.json", DATA_DIR / "bestsellers.json",
+    ).load()
+
+    serializer = "orjson" if fast_json.orjson is not None else "stdlib json"
+    print(f"FastJSONResponse uses {serializer}; best of {repeats} runs\n")
+    print(f"{'payload':<20} {'size':>10} {'default':>10} {'no encoder':>11} {'fast':>9} {'speedup':>8}")
+
+    for name, content in payloads(snapshot).items():
+        if default_path(content) != fast_path(content):
+            print(f"{name}: output differs between paths!")
+        size = len(fast_path(content))
+        default_ms = timed(default_path, content, repeats)
+        plain_ms = timed(no_encoder_path, content, repeats)
+        fast_ms = timed(fast_path, content, repeats)
+        print(f"{name:<20} {size:>10,} {default_ms:>8.2f}ms {plain_ms:>9.2f}ms "
+              f"{fast_ms:>7.2f}ms {default_ms / fast_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
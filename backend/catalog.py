@@ -0,0 +1,471 @@
+"""
+Home & Verse - Catalog Store
+=============================
+Keeps products, stock, rankings and bestsellers in memory as a single
+immutable snapshot, so API requests never re-read the JSON files.
+
+A background watcher polls the data files' mtime/inode every
+CATALOG_CHECK_INTERVAL seconds and, when they change, builds a new
+snapshot off the request path and swaps it in. `reload()` does the same on
+demand (POST /admin/reload). A snapshot is fully built before it is
+published, so readers always see either the old catalog or the new one -
+never a mix - and requests in flight keep the snapshot they started with.
+
+Without a running watcher, `get()` falls back to checking the files itself.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import Optional
+
+from catalog_snapshot import open_catalog_snapshot
+from compact import CompactProducts
+from diversify import DiversifiedRanking
+from facets import FacetIndex
+from fragments import ProductFragments
+from search_index import SearchIndex
+
+# How often (seconds) to stat the data files for changes
+CATALOG_CHECK_INTERVAL = float(os.getenv("CATALOG_CHECK_INTERVAL", "2"))
+
+
+def load_products(path: Path) -> list[dict]:
+    """Load products from local JSON file"""
+    if not path.exists():
+        return []
+    with open(path) as f:
+        data = json.load(f)
+    return data.get("products", [])
+
+
+def load_stock(path: Path) -> dict:
+    """Load stock levels from local JSON file"""
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        data = json.load(f)
+    return data.get("stock", {})
+
+
+def load_rankings_file(path: Path) -> dict:
+    """Load the full rankings file (rankings plus generation metadata)"""
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_bestsellers(path: Path) -> dict:
+    """Load bestsellers from local JSON file"""
+    if not path.exists():
+        return {"bestsellers": [], "generated_at": None}
+    with open(path) as f:
+        return json.load(f)
+
+
+def file_signature(path: Path) -> Optional[tuple]:
+    """(mtime, inode, size) for a file, or None if it doesn't exist"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_ino, st.st_size)
+
+
+def signature_version(signature: tuple) -> tuple:
+    """(version string, latest mtime in seconds) for a tuple of file signatures"""
+    version = hashlib.sha1(repr(signature).encode()).hexdigest()[:16]
+    modified_at = max((sig[0] for sig in signature if sig), default=0) / 1e9
+    return version, modified_at
+
+
+def product_categories(product: dict) -> list:
+    """Product's categories (supports old single category and new array)"""
+    return product.get("categories", [product.get("category", "")])
+
+
+@dataclass(frozen=True)
+class CatalogIndexes:
+    """Inverted filter indexes, built once per snapshot"""
+    position: dict      # sku -> index into snapshot.products (file order)
+    all_skus: frozenset
+    by_brand: dict      # lowercase brand -> frozenset of skus
+    by_category: dict   # lowercase category -> frozenset of skus
+    in_stock: frozenset
+    has_image: frozenset
+
+
+def build_indexes(products: tuple) -> CatalogIndexes:
+    """Build filter indexes for a product list"""
+    position = {}
+    by_brand = {}
+    by_category = {}
+    in_stock = set()
+    has_image = set()
+
+    for i, product in enumerate(products):
+        sku = product.get("sku", "")
+        position[sku] = i
+        by_brand.setdefault(product.get("brand", "").lower(), set()).add(sku)
+        for category in product_categories(product):
+            by_category.setdefault(category.lower(), set()).add(sku)
+        if product.get("in_stock", False):
+            in_stock.add(sku)
+        if product.get("has_image", False):
+            has_image.add(sku)
+
+    return CatalogIndexes(
+        position=position,
+        all_skus=frozenset(position),
+        by_brand={k: frozenset(v) for k, v in by_brand.items()},
+        by_category={k: frozenset(v) for k, v in by_category.items()},
+        in_stock=frozenset(in_stock),
+        has_image=frozenset(has_image),
+    )
+
+
+@dataclass(frozen=True)
+class CatalogAggregates:
+    """Facet counts and stats, computed once per snapshot"""
+    brands: dict       # /api/brands response
+    categories: dict   # /api/categories response
+    stats: dict        # /api/stats response
+    displayable: int   # products with images
+
+
+def build_aggregates(products: tuple) -> CatalogAggregates:
+    """Count brands, categories and stock/image stats for a product list"""
+    in_stock = 0
+    with_images = 0
+    multi_category = 0
+    brands = {}
+    categories = {}
+
+    for p in products:
+        if p.get("in_stock", False):
+            in_stock += 1
+        if len(p.get("categories", [])) > 1:
+            multi_category += 1
+        # Only count products with images
+        if not p.get("has_image", False):
+            continue
+        with_images += 1
+        brand = p.get("brand", "Other")
+        brands[brand] = brands.get(brand, 0) + 1
+        for cat in p.get("categories", [p.get("category", "Other")]):
+            categories[cat] = categories.get(cat, 0) + 1
+
+    return CatalogAggregates(
+        brands={
+            "brands": [
+                {"name": brand, "count": count}
+                for brand, count in sorted(brands.items())
+            ]
+        },
+        categories={
+            "categories": [
+                {"name": cat, "count": count}
+                for cat, count in sorted(categories.items())
+            ],
+            "total_products": with_images
+        },
+        stats={
+            "total_products": len(products),
+            "displayable_products": with_images,
+            "in_stock": in_stock,
+            "out_of_stock": len(products) - in_stock,
+            "with_images": with_images,
+            "without_images": len(products) - with_images,
+            "multi_category_products": multi_category,
+            "brands": brands,
+            "categories": categories
+        },
+        displayable=with_images,
+    )
+
+
+def popularity_score(rankings: dict, sku: str) -> int:
+    """Popularity score for a SKU (50 if unranked)"""
+    return rankings.get(sku, 50)
+
+
+# Sort orders precomputed per snapshot (ties keep catalog file order)
+SORT_KEYS = {
+    "popularity": lambda p, rankings: -popularity_score(rankings, p.get("sku", "")),
+    "price-asc": lambda p, rankings: p.get("price", 0),
+    "price-desc": lambda p, rankings: -p.get("price", 0),
+    "name": lambda p, rankings: p.get("name", "").lower(),
+}
+
+
+@dataclass(frozen=True)
+class SortOrder:
+    """All SKUs in one sort order, plus each SKU's rank in it"""
+    skus: tuple
+    rank: dict
+
+
+def build_sort_orders(products: tuple, rankings: dict) -> dict:
+    """Precompute every SORT_KEYS ordering for a product list"""
+    orders = {}
+    for name, key in SORT_KEYS.items():
+        ordered = sorted(products, key=lambda p: key(p, rankings))
+        skus = tuple(p.get("sku", "") for p in ordered)
+        orders[name] = SortOrder(skus=skus, rank={sku: i for i, sku in enumerate(skus)})
+    return orders
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """
+    One consistent view of the catalog.
+
+    Products are stored column-wise (see compact.py); query helpers work on
+    SKUs and only the products actually returned are materialized as dicts.
+    Treat the rest (rankings, bestsellers, indexes) as read-only.
+    """
+    version: str
+    loaded_at: float
+    modified_at: float  # newest data file mtime (same on every worker)
+    products: CompactProducts  # or a MappedCatalog - same interface
+    rankings: dict  # sku -> popularity score
+    rankings_info: dict
+    bestsellers: dict
+    indexes: CatalogIndexes
+    search: SearchIndex
+    sort_orders: dict  # sort name -> SortOrder
+    diversity: DiversifiedRanking
+    item_ids: dict  # sku -> Zoho item_id
+    aggregates: CatalogAggregates
+    facets: FacetIndex
+    fragments: ProductFragments
+
+    def has_sku(self, sku: str) -> bool:
+        return sku in self.indexes.position
+
+    def product(self, sku: str, fields: Optional[set] = None) -> Optional[dict]:
+        """Product by SKU (None if not in the catalog)"""
+        i = self.indexes.position.get(sku)
+        return None if i is None else self.products.materialize(i, fields)
+
+    def item_id(self, sku: str) -> Optional[str]:
+        """Zoho item_id for a SKU (None if unknown)"""
+        return self.item_ids.get(sku)
+
+    def filter_skus(self, brand: Optional[str] = None, category: Optional[str] = None,
+                    in_stock_only: bool = False, with_images_only: bool = False) -> frozenset:
+        """SKUs matching all the given filters (set intersection over the indexes)"""
+        idx = self.indexes
+        sets = []
+        if with_images_only:
+            sets.append(idx.has_image)
+        if brand:
+            sets.append(idx.by_brand.get(brand.lower(), frozenset()))
+        if category:
+            sets.append(idx.by_category.get(category.lower(), frozenset()))
+        if in_stock_only:
+            sets.append(idx.in_stock)
+
+        if not sets:
+            return idx.all_skus
+        # Intersect smallest first
+        sets.sort(key=len)
+        return sets[0].intersection(*sets[1:])
+
+    def skus_in_file_order(self, skus) -> list[str]:
+        """A set of SKUs in catalog file order"""
+        position = self.indexes.position
+        return sorted(skus, key=position.__getitem__)
+
+    def skus_sorted(self, sort: str, skus) -> list[str]:
+        """A set of SKUs in a precomputed sort order"""
+        order = self.sort_orders[sort]
+        if len(skus) * 12 < len(order.skus):
+            # Small result - sorting it by rank beats a full pass
+            return sorted(skus, key=order.rank.__getitem__)
+        return [sku for sku in order.skus if sku in skus]
+
+    def products_ranked(self, skus, fields: Optional[set] = None) -> list[dict]:
+        """Materialize products for a sequence of SKUs, keeping the given order"""
+        position = self.indexes.position
+        materialize = self.products.materialize
+        return [materialize(position[sku], fields) for sku in skus]
+
+    def product_fragments(self, skus, fields: Optional[set] = None) -> list[bytes]:
+        """Pre-rendered JSON for a sequence of SKUs (see fragments.py)"""
+        position = self.indexes.position
+        return self.fragments.render([position[sku] for sku in skus], skus, fields)
+
+    def popularity(self, sku: str) -> int:
+        """Popularity score for a SKU (50 if unranked)"""
+        return popularity_score(self.rankings, sku)
+
+
+def build_snapshot(files: dict, version: str, modified_at: float = 0.0) -> CatalogSnapshot:
+    """Read all data files and build a new snapshot"""
+    # Indexes are built from plain dicts: either the index columns of a fresh
+    # binary snapshot (no JSON parse), or the parsed products.json, which is
+    # then dropped in favour of the compact column store
+    mapped = None
+    if files.get("snapshot"):
+        mapped = open_catalog_snapshot(files["snapshot"], files["products"])
+    if mapped is not None:
+        products = tuple(mapped.index_rows())
+        store = mapped
+    else:
+        products = tuple(load_products(files["products"]))
+        store = CompactProducts(products)
+
+    return assemble_snapshot(
+        store, products,
+        stock=load_stock(files["stock"]),
+        rankings_data=load_rankings_file(files["rankings"]),
+        bestsellers=load_bestsellers(files["bestsellers"]),
+        version=version,
+        modified_at=modified_at,
+    )
+
+
+def assemble_snapshot(store, products: tuple, stock: dict, rankings_data: dict,
+                      bestsellers: dict, version: str,
+                      modified_at: float = 0.0) -> CatalogSnapshot:
+    """
+    Build indexes over already-loaded data. `store` serves full records,
+    `products` holds (at least) the fields the indexes use, in the same order.
+    """
+    rankings_info = {k: v for k, v in rankings_data.items() if k != "rankings"}
+    # Only the score is used at request time
+    rankings = {
+        sku: ranking.get("score", 50)
+        for sku, ranking in rankings_data.get("rankings", {}).items()
+    }
+    sort_orders = build_sort_orders(products, rankings)
+    item_ids = {
+        p.get("sku", ""): p.get("id") or stock.get(p.get("sku", ""), {}).get("zoho_item_id")
+        for p in products
+    }
+
+    return CatalogSnapshot(
+        version=version,
+        loaded_at=time.time(),
+        modified_at=modified_at,
+        products=store,
+        rankings=rankings,
+        rankings_info=rankings_info,
+        bestsellers=bestsellers,
+        indexes=build_indexes(products),
+        search=SearchIndex(products),
+        sort_orders=sort_orders,
+        diversity=DiversifiedRanking(products, sort_orders["popularity"].skus),
+        item_ids=item_ids,
+        aggregates=build_aggregates(products),
+        facets=FacetIndex(products),
+        fragments=ProductFragments(store, partial(popularity_score, rankings)),
+    )
+
+
+class CatalogStore:
+    """Process-wide holder of the current CatalogSnapshot"""
+
+    def __init__(self, products_file: Path, stock_file: Path,
+                 rankings_file: Path, bestsellers_file: Path,
+                 snapshot_file: Optional[Path] = None):
+        self.files = {
+            "products": products_file,
+            "stock": stock_file,
+            "rankings": rankings_file,
+            "bestsellers": bestsellers_file,
+        }
+        if snapshot_file is not None:
+            self.files["snapshot"] = snapshot_file
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._signature = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_watching = threading.Event()
+
+    @property
+    def current(self) -> Optional[CatalogSnapshot]:
+        """Last published snapshot, without checking the files (None before first load)"""
+        return self._snapshot
+
+    def _current_signature(self) -> tuple:
+        return tuple(file_signature(path) for path in self.files.values())
+
+    def load(self) -> CatalogSnapshot:
+        """Build a snapshot from the files on disk and publish it"""
+        return self.reload(force=True)
+
+    def reload(self, force: bool = False) -> CatalogSnapshot:
+        """
+        Rebuild and publish the snapshot if the data files changed (always,
+        with force). Concurrent callers wait for one build instead of
+        starting their own.
+        """
+        with self._lock:
+            signature = self._current_signature()
+            if not force and self._snapshot is not None and signature == self._signature:
+                self._checked_at = time.monotonic()
+                return self._snapshot
+            version, modified_at = signature_version(signature)
+            snapshot = build_snapshot(self.files, version, modified_at)
+            # Single reference assignment - readers see old or new, never partial
+            self._signature = signature
+            self._snapshot = snapshot
+            self._checked_at = time.monotonic()
+            return snapshot
+
+    def get(self) -> CatalogSnapshot:
+        """Current snapshot, reloading first if the data files have changed"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.load()
+        if self._watcher is not None:
+            return snapshot  # the watcher reloads in the background
+
+        now = time.monotonic()
+        if now - self._checked_at < CATALOG_CHECK_INTERVAL:
+            return snapshot
+
+        self._checked_at = now
+        if self._current_signature() != self._signature:
+            return self.load()
+        return snapshot
+
+    # ==========================================
+    # BACKGROUND RELOAD
+    # ==========================================
+
+    def start_watching(self, interval: float = CATALOG_CHECK_INTERVAL):
+        """Start a daemon thread that reloads whenever the data files change"""
+        if self._watcher is not None:
+            return
+        self._stop_watching.clear()
+        self._watcher = threading.Thread(
+            target=self._watch, args=(interval,), name="catalog-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def stop_watching(self):
+        watcher = self._watcher
+        if watcher is None:
+            return
+        self._stop_watching.set()
+        watcher.join()
+        self._watcher = None
+
+    def _watch(self, interval: float):
+        while not self._stop_watching.wait(interval):
+            try:
+                self.reload()
+            except Exception as e:
+                # Half-written or invalid files - keep serving the old
+                # snapshot and retry on the next tick
+                print(f"Catalog reload failed: {e}")
@@ -0,0 +1,315 @@
+"""
+Home & Verse - Binary Catalog Snapshot
+=======================================
+Versioned binary copy of products.json that main.py memory-maps at
+startup. Every uvicorn worker maps the same file, so the product data is
+shared through the OS page cache instead of parsed into each process.
+
+Layout (little-endian):
+    header      magic, format version, product count, source products.json
+                size + mtime, section count
+    directory   one entry per section: name, typecode, offset, item count
+    sections    fixed-width columns (one value per product), a string table
+                (offsets + UTF-8 blob), category combinations, the full
+                product records as compact JSON (dump_json output, so API
+                responses can reuse them as is) with their offsets, and any
+                named attachments (raw bytes, "a:<name>")
+
+The fixed-width columns hold everything the catalog indexes need, so a
+cold start builds filters, sorts, facets and search without decoding a
+single JSON record. Records are decoded only when a product is returned.
+
+products.json stays the source of truth and export format. A snapshot is
+only used while its recorded source size/mtime match products.json, so
+scripts that rewrite the JSON directly never serve stale data.
+
+Usage (rebuild from products.json):
+    cd backend
+    python3 catalog_snapshot.py
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Optional
+
+from fast_json import dump_json
+
+MAGIC = b"HVCATLG\0"
+FORMAT_VERSION = 1
+
+# magic, version, product count, source size, source mtime_ns, section count
+HEADER = struct.Struct("<8sHIQqI")
+# name, typecode, offset, item count
+SECTION = struct.Struct("<16s1sxxxQQ")
+
+NO_STRING = 0xFFFFFFFF
+
+FLAG_IN_STOCK = 1
+FLAG_HAS_IMAGE = 2
+FLAG_HAS_CATEGORIES = 4
+FLAG_HAS_PRICE = 8
+
+# Per-product string columns (ids into the string table)
+STRING_COLUMNS = ["id", "sku", "name", "brand", "description", "ean", "category"]
+
+DATA_DIR = Path("data")
+PRODUCTS_FILE = DATA_DIR / "products.json"
+SNAPSHOT_FILE = DATA_DIR / "catalog.bin"
+
+
+def source_signature(path: Path) -> Optional[tuple]:
+    """(size, mtime_ns) of the source JSON, or None if missing"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_size, st.st_mtime_ns)
+
+
+# ==========================================
+# WRITER
+# ==========================================
+
+def write_catalog_snapshot(products: list[dict], path: Path = SNAPSHOT_FILE,
+                           source: Path = PRODUCTS_FILE,
+                           attachments: Optional[dict] = None):
+    """
+    Write a binary snapshot of `products` (which must be what `source`
+    currently contains). Written to a temp file and renamed into place, so
+    processes that already mapped the old file keep a consistent view.
+    `attachments` maps short names to bytes stored alongside the products.
+    """
+    strings = {}
+
+    def string_id(value) -> int:
+        if not isinstance(value, str):
+            return NO_STRING
+        return strings.setdefault(value, len(strings))
+
+    combos = {}
+    columns = {name: array("I") for name in STRING_COLUMNS}
+    combo_ids = array("I")
+    flags = array("B")
+    price = array("d")
+    trade_price = array("d")
+    stock = array("q")
+    record_offsets = array("Q", [0])
+    records = []
+
+    for p in products:
+        for name in STRING_COLUMNS:
+            columns[name].append(string_id(p.get(name)))
+
+        cats = tuple(string_id(c) for c in p.get("categories") or ())
+        combo_ids.append(combos.setdefault(cats, len(combos)))
+
+        flag = 0
+        if p.get("in_stock", False):
+            flag |= FLAG_IN_STOCK
+        if p.get("has_image", False):
+            flag |= FLAG_HAS_IMAGE
+        if "categories" in p:
+            flag |= FLAG_HAS_CATEGORIES
+        if "price" in p:
+            flag |= FLAG_HAS_PRICE
+        flags.append(flag)
+
+        price.append(float(p.get("price") or 0))
+        trade_price.append(float(p.get("trade_price") or 0))
+        stock.append(int(p.get("stock") or 0))
+
+        record = dump_json(p)
+        records.append(record)
+        record_offsets.append(record_offsets[-1] + len(record))
+
+    string_blobs = [s.encode("utf-8") for s in strings]
+    string_offsets = array("Q", [0])
+    for blob in string_blobs:
+        string_offsets.append(string_offsets[-1] + len(blob))
+
+    combo_offsets = array("Q", [0])
+    combo_items = array("I")
+    for cats in combos:
+        combo_items.extend(cats)
+        combo_offsets.append(len(combo_items))
+
+    sections = [(f"s:{name}", columns[name]) for name in STRING_COLUMNS] + [
+        ("combo", combo_ids),
+        ("flags", flags),
+        ("price", price),
+        ("trade_price", trade_price),
+        ("stock", stock),
+        ("str_offsets", string_offsets),
+        ("str_blob", array("B", b"".join(string_blobs))),
+        ("combo_offsets", combo_offsets),
+        ("combo_items", combo_items),
+        ("rec_offsets", record_offsets),
+        ("rec_blob", array("B", b"".join(records))),
+    ] + [
+        (f"a:{name}", array("B", data)) for name, data in (attachments or {}).items()
+    ]
+
+    signature = source_signature(source) or (0, 0)
+    offset = HEADER.size + SECTION.size * len(sections)
+    directory = []
+    for name, data in sections:
+        offset += -offset % 8  # keep every column 8-byte aligned
+        directory.append((name, data, offset))
+        offset += len(data) * data.itemsize
+
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(products),
+                            signature[0], signature[1], len(sections)))
+        for name, data, start in directory:
+            f.write(SECTION.pack(name.encode(), data.typecode.encode(), start, len(data)))
+        for name, data, start in directory:
+            f.write(b"\0" * (start - f.tell()))
+            if sys.byteorder != "little":
+                data = array(data.typecode, data)
+                data.byteswap()
+            data.tofile(f)
+    os.replace(tmp_path, path)
+
+
+# ==========================================
+# READER
+# ==========================================
+
+class MappedCatalog:
+    """
+    Read-only product sequence backed by a memory-mapped snapshot.
+    Same interface as compact.CompactProducts.
+    """
+
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mmap)
+
+        magic, version, count, size, mtime_ns, n_sections = HEADER.unpack_from(buf, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported catalog snapshot: {path}")
+        self.source_signature = (size, mtime_ns)
+        self._len = count
+
+        # Zero-copy typed views straight onto the mapped pages
+        self._sections = {}
+        self._extents = {}  # section name -> (start, end) byte offsets in the file
+        for i in range(n_sections):
+            name, typecode, start, length = SECTION.unpack_from(buf, HEADER.size + i * SECTION.size)
+            name = name.rstrip(b"\0").decode()
+            end = start + length * array(typecode.decode()).itemsize
+            self._sections[name] = buf[start:end].cast(typecode.decode())
+            self._extents[name] = (start, end)
+
+        s = self._sections
+        self._str_offsets = s["str_offsets"]
+        self._str_blob = s["str_blob"]
+        self._rec_offsets = s["rec_offsets"]
+        self._rec_blob = s["rec_blob"]
+
+    def string(self, string_id: int) -> Optional[str]:
+        """Decode one string-table entry"""
+        if string_id == NO_STRING:
+            return None
+        a, b = self._str_offsets[string_id], self._str_offsets[string_id + 1]
+        return str(self._str_blob[a:b], "utf-8")
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __getitem__(self, i: int) -> dict:
+        if not -self._len <= i < self._len:
+            raise IndexError("product index out of range")
+        return self.materialize(i % self._len)
+
+    def __iter__(self):
+        for i in range(self._len):
+            yield self.materialize(i)
+
+    def record(self, i: int) -> memoryview:
+        """Product i's stored JSON (what dump_json gives for the product), uncopied"""
+        a, b = self._rec_offsets[i], self._rec_offsets[i + 1]
+        return self._rec_blob[a:b]
+
+    def records_contain(self, data: bytes) -> bool:
+        """Whether any stored record contains these bytes"""
+        start, end = self._extents["rec_blob"]
+        return self._mmap.find(data, start, end) != -1
+
+    def materialize(self, i: int, fields: Optional[set] = None) -> dict:
+        """Decode product i's record, optionally only the given fields"""
+        a, b = self._rec_offsets[i], self._rec_offsets[i + 1]
+        product = json.loads(str(self._rec_blob[a:b], "utf-8"))
+        if fields is None:
+            return product
+        return {k: v for k, v in product.items() if k in fields}
+
+    def attachment(self, name: str) -> Optional[bytes]:
+        """Bytes of a named attachment, or None if the snapshot has none"""
+        section = self._sections.get(f"a:{name}")
+        return None if section is None else section.tobytes()
+
+    def index_rows(self):
+        """
+        Yield the fields the catalog indexes use, built from the fixed-width
+        columns only (no JSON decoding). Absent keys stay absent.
+        """
+        s = self._sections
+        string = self.string
+        string_columns = [(name, s[f"s:{name}"]) for name in STRING_COLUMNS]
+        combo_offsets, combo_items = s["combo_offsets"], s["combo_items"]
+        combos = {}
+
+        for i in range(self._len):
+            row = {}
+            for name, column in string_columns:
+                value = string(column[i])
+                if value is not None:
+                    row[name] = value
+
+            flag = s["flags"][i]
+            row["in_stock"] = bool(flag & FLAG_IN_STOCK)
+            row["has_image"] = bool(flag & FLAG_HAS_IMAGE)
+            if flag & FLAG_HAS_PRICE:
+                row["price"] = s["price"][i]
+            if flag & FLAG_HAS_CATEGORIES:
+                combo = s["combo"][i]
+                if combo not in combos:
+                    a, b = combo_offsets[combo], combo_offsets[combo + 1]
+                    combos[combo] = [string(x) for x in combo_items[a:b]]
+                row["categories"] = list(combos[combo])
+            yield row
+
+
+def open_catalog_snapshot(path: Path, source: Path) -> Optional[MappedCatalog]:
+    """Map the snapshot if it exists and matches `source`; otherwise None"""
+    if sys.byteorder != "little" or not Path(path).exists():
+        return None
+    try:
+        mapped = MappedCatalog(path)
+    except (OSError, ValueError, KeyError, struct.error):
+        return None
+    if mapped.source_signature != source_signature(source):
+        return None  # products.json changed since the snapshot was written
+    return mapped
+
+
+def build_from_json(products_file: Path = PRODUCTS_FILE, path: Path = SNAPSHOT_FILE):
+    """Rebuild the snapshot from products.json"""
+    with open(products_file) as f:
+        products = json.load(f).get("products", [])
+    write_catalog_snapshot(products, path, products_file)
+    return len(products)
+
+
+if __name__ == "__main__":
+    count = build_from_json()
+    print(f"Wrote {SNAPSHOT_FILE} ({count} products, {SNAPSHOT_FILE.stat().st_size:,} bytes)")
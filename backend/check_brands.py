@@ -1,53 +1,25 @@
 """Quick check of Zoho brands and product data"""
 import asyncio
-import httpx
-import os
-from dotenv import load_dotenv
 from collections import Counter
 
-load_dotenv()
-
-ZOHO_CLIENT_ID = os.getenv("ZOHO_CLIENT_ID")
-ZOHO_CLIENT_SECRET = os.getenv("ZOHO_CLIENT_SECRET")
-ZOHO_REFRESH_TOKEN = os.getenv("ZOHO_REFRESH_TOKEN")
-ZOHO_ORG_ID = os.getenv("ZOHO_ORG_ID")
-
-async def get_token():
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            "https://accounts.zoho.eu/oauth/v2/token",
-            params={
-                "refresh_token": ZOHO_REFRESH_TOKEN,
-                "client_id": ZOHO_CLIENT_ID,
-                "client_secret": ZOHO_CLIENT_SECRET,
-                "grant_type": "refresh_token"
-            }
-        )
-        return response.json()["access_token"]
+from zoho_client import zoho
 
 async def check_brands():
-    token = await get_token()
-    
     all_items = []
     page = 1
     
     print("Fetching all items from Zoho...")
     while True:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(
-                "https://www.zohoapis.eu/inventory/v1/items",
-                headers={"Authorization": f"Zoho-oauthtoken {token}"},
-                params={"organization_id": ZOHO_ORG_ID, "page": page, "per_page": 200}
-            )
-            data = response.json()
-            items = data.get("items", [])
-            all_items.extend(items)
-            print(f"  Page {page}: {len(items)} items (total: {len(all_items)})")
-            
-            if not data.get("page_context", {}).get("has_more_page", False):
-                break
-            page += 1
-            await asyncio.sleep(0.3)
+        response = await zoho.request("GET", "items", params={"page": page, "per_page": 200})
+        data = response.json()
+        items = data.get("items", [])
+        all_items.extend(items)
+        print(f"  Page {page}: {len(items)} items (total: {len(all_items)})")
+        
+        if not data.get("page_context", {}).get("has_more_page", False):
+            break
+        page += 1
+        await asyncio.sleep(0.3)
     
     print(f"\n{'='*60}")
     print(f"TOTAL ITEMS: {len(all_items)}")
@@ -138,4 +110,8 @@ async def check_brands():
                 val = val[:50] + "..."
             print(f"  {key}: {val}")
 
-asyncio.run(check_brands())
+async def main():
+    async with zoho:  # closes the connection pool when done
+        await check_brands()
+
+asyncio.run(main())
@@ -0,0 +1,133 @@
+"""
+Home & Verse - Compact Product Storage
+=======================================
+Column-oriented storage for the catalog, so each worker doesn't hold
+4,000+ dicts with repeated keys.
+
+- Numbers and flags live in typed `array` columns.
+- Brand/category-like strings are interned into small integer codes.
+- Long text (descriptions, meta copy) is kept as one UTF-8 blob per
+  column and only decoded when a product is materialized.
+- Key order per product is kept as a shared "schema" tuple.
+
+Products are materialized back into plain dicts (same keys, same order,
+same values as products.json) only when a response needs them. A column
+falls back to a plain list if any value doesn't fit its declared type,
+so the output is always identical to the JSON input.
+"""
+
+from array import array
+from typing import Optional
+
+# Declared storage for known fields; anything else is kept as a plain list
+COLUMN_KINDS = {
+    "price": "float",
+    "trade_price": "float",
+    "stock": "int",
+    "has_image": "flag",
+    "in_stock": "flag",
+    "brand": "code",
+    "category": "code",
+    "subcategory": "code",
+    "product_type": "code",
+    "color": "code",
+    "collection": "code",
+    "size": "code",
+    "categories": "codes",
+    "description": "text",
+    "meta_title": "text",
+    "meta_description": "text",
+}
+
+_KIND_CHECKS = {
+    "float": lambda v: type(v) is float,
+    "int": lambda v: type(v) is int,
+    "flag": lambda v: type(v) is bool,
+    "code": lambda v: type(v) is str,
+    "codes": lambda v: type(v) is list and all(type(x) is str for x in v),
+    "text": lambda v: type(v) is str,
+}
+
+
+def _build_column(kind: str, values: list):
+    """Store one column; returns a getter(i) -> value"""
+    if kind == "float":
+        data = array("d", (v or 0.0 for v in values))
+        return data.__getitem__
+
+    if kind == "int":
+        data = array("q", (v or 0 for v in values))
+        return data.__getitem__
+
+    if kind == "flag":
+        data = array("B", (1 if v else 0 for v in values))
+        return lambda i: data[i] == 1
+
+    if kind == "code":
+        table = {}
+        codes = array("I", (table.setdefault(v, len(table)) for v in values))
+        strings = list(table)
+        return lambda i: strings[codes[i]]
+
+    if kind == "codes":
+        table = {}
+        codes = array("I", (table.setdefault(tuple(v or ()), len(table)) for v in values))
+        combos = list(table)
+        return lambda i: list(combos[codes[i]])
+
+    if kind == "text":
+        chunks = []
+        offsets = array("Q", [0])
+        for v in values:
+            chunks.append((v or "").encode("utf-8"))
+            offsets.append(offsets[-1] + len(chunks[-1]))
+        blob = b"".join(chunks)
+        return lambda i: blob[offsets[i]:offsets[i + 1]].decode("utf-8")
+
+    data = list(values)
+    return data.__getitem__
+
+
+class CompactProducts:
+    """Read-only sequence of products backed by columns"""
+
+    def __init__(self, products):
+        self._len = len(products)
+
+        # Shared key-order tuples
+        schema_ids = {}
+        self.schema_of = array("H", (
+            schema_ids.setdefault(tuple(p), len(schema_ids)) for p in products
+        ))
+        self.schemas = list(schema_ids)
+
+        keys = list(dict.fromkeys(k for schema in self.schemas for k in schema))
+        self.columns = {}
+        for key in keys:
+            values = [p.get(key) for p in products]
+            kind = COLUMN_KINDS.get(key, "value")
+            if kind != "value":
+                check = _KIND_CHECKS[kind]
+                if not all(check(p[key]) for p in products if key in p):
+                    kind = "value"
+            self.columns[key] = _build_column(kind, values)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __getitem__(self, i: int) -> dict:
+        if not -self._len <= i < self._len:
+            raise IndexError("product index out of range")
+        return self.materialize(i % self._len)
+
+    def __iter__(self):
+        for i in range(self._len):
+            yield self.materialize(i)
+
+    def materialize(self, i: int, fields: Optional[set] = None) -> dict:
+        """Product i as a plain dict, optionally only the given fields"""
+        columns = self.columns
+        schema = self.schemas[self.schema_of[i]]
+        if fields is None:
+            return {key: columns[key](i) for key in schema}
+        return {key: columns[key](i) for key in schema if key in fields}
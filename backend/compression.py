@@ -0,0 +1,88 @@
+"""
+Home & Verse - API Response Compression
+========================================
+Content-negotiated brotli/gzip for JSON API responses.
+
+- Bodies under API_COMPRESSION_MIN_SIZE bytes are sent as they are.
+- Responses that already carry a Content-Encoding (the listing cache,
+  pre-compressed static files) are passed through untouched.
+- Bodies over API_COMPRESSION_THREAD_SIZE bytes are compressed in the
+  threadpool, so one big response can't stall the event loop.
+
+Levels favour speed: these bodies are compressed per request, unlike the
+cached listings (response_cache.py) which are compressed once per
+catalog version.
+"""
+
+import gzip
+import os
+
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+
+from response_cache import accepted_encodings
+
+try:
+    import brotli
+except ImportError:  # gzip-only until brotli is installed
+    brotli = None
+
+API_COMPRESSION_MIN_SIZE = int(os.getenv("API_COMPRESSION_MIN_SIZE", "1024"))
+API_COMPRESSION_THREAD_SIZE = int(os.getenv("API_COMPRESSION_THREAD_SIZE", "262144"))
+API_GZIP_LEVEL = int(os.getenv("API_GZIP_LEVEL", "6"))
+API_BROTLI_QUALITY = int(os.getenv("API_BROTLI_QUALITY", "4"))
+
+
+def choose_encoding(accept_encoding: str):
+    """Best encoding we can produce that the client accepts (None = identity)"""
+    accepted = accepted_encodings(accept_encoding)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=API_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=API_GZIP_LEVEL)
+
+
+class APICompressionMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app, prefix: str = "/api/",
+                 minimum_size: int = API_COMPRESSION_MIN_SIZE,
+                 thread_size: int = API_COMPRESSION_THREAD_SIZE):
+        super().__init__(app)
+        self.prefix = prefix
+        self.minimum_size = minimum_size
+        self.thread_size = thread_size
+
+    async def dispatch(self, request: Request, call_next):
+        response = await call_next(request)
+        if request.method != "GET" or not request.url.path.startswith(self.prefix) \
+                or response.status_code != 200 \
+                or "content-encoding" in response.headers \
+                or not response.headers.get("content-type", "").startswith("application/json"):
+            return response
+
+        encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        if encoding is not None and len(body) >= self.minimum_size:
+            if len(body) >= self.thread_size:
+                body = await run_in_threadpool(compress, body, encoding)
+            else:
+                body = compress(body, encoding)
+        else:
+            encoding = None
+
+        compressed = Response(content=body, status_code=response.status_code)
+        compressed.raw_headers = [
+            (k, v) for k, v in response.raw_headers
+            if k not in (b"content-length", b"vary")
+        ] + [(b"content-length", str(len(body)).encode()), (b"vary", b"Accept-Encoding")]
+        if encoding is not None:
+            compressed.raw_headers.append((b"content-encoding", encoding.encode()))
+        return compressed
@@ -0,0 +1,221 @@
+"""
+Home & Verse - Customer Cache
+==============================
+Email -> Zoho contact_id, in a local SQLite file, so returning customers
+skip the contact search on checkout.
+
+- Emails are matched case-insensitively (stripped, lower-cased).
+- `warm()` pages through every Zoho customer contact and stores all of
+  them in one go. The API does this in the background at startup when
+  the last warm is older than CUSTOMER_CACHE_MAX_AGE; one worker per host
+  does it (flock), the others use the same file.
+- "No such contact" is cached too, for CUSTOMER_CACHE_NEGATIVE_TTL
+  seconds only - the contact may be created in Zoho at any time.
+- Entries are written whenever a contact is found or created at checkout,
+  and `forget()` drops one Zoho turned out not to know any more.
+- The methods are blocking (another worker may hold the write lock for
+  up to the 5 s busy timeout); async code calls them via asyncio.to_thread.
+
+Usage:
+    python3 customer_cache.py      # warm the cache now
+"""
+
+import asyncio
+import fcntl
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from zoho_client import zoho
+
+CUSTOMER_CACHE_FILE = Path(os.getenv("CUSTOMER_CACHE_FILE", "data/customers.db"))
+
+# Seconds a "no contact with this email" answer is trusted
+CUSTOMER_CACHE_NEGATIVE_TTL = float(os.getenv("CUSTOMER_CACHE_NEGATIVE_TTL", "60"))
+
+# Re-warm from Zoho at startup when the last full warm is older than this
+CUSTOMER_CACHE_MAX_AGE = float(os.getenv("CUSTOMER_CACHE_MAX_AGE", "86400"))
+
+CONTACTS_PER_PAGE = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS customers (
+    email TEXT PRIMARY KEY,
+    contact_id TEXT,            -- NULL: Zoho has no contact for this email
+    contact_name TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Lookup results
+MISS = "miss"          # not cached - ask Zoho
+NOT_FOUND = "absent"   # recently confirmed absent in Zoho
+
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+class CustomerCache:
+    """SQLite-backed email -> contact map, safe to share between workers"""
+
+    def __init__(self, path: Path = CUSTOMER_CACHE_FILE,
+                 negative_ttl: float = CUSTOMER_CACHE_NEGATIVE_TTL):
+        self.path = Path(path)
+        self.negative_ttl = negative_ttl
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """The connection (opened, and the schema created, on first use)"""
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # ==========================================
+    # LOOKUPS
+    # ==========================================
+
+    def get(self, email: str):
+        """
+        {"contact_id", "contact_name", "email"} for a cached customer,
+        NOT_FOUND for a recent negative answer, or MISS.
+        """
+        email = normalize_email(email)
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT contact_id, contact_name, updated_at FROM customers WHERE email = ?",
+                (email,)
+            ).fetchone()
+        if row is None:
+            return MISS
+        contact_id, contact_name, updated_at = row
+        if contact_id is None:
+            return NOT_FOUND if time.time() - updated_at < self.negative_ttl else MISS
+        return {"contact_id": contact_id, "contact_name": contact_name, "email": email}
+
+    def put(self, email: str, contact_id: str, contact_name: str = None):
+        self.put_many([(email, contact_id, contact_name)])
+
+    def put_many(self, entries):
+        """Store (email, contact_id, contact_name) tuples"""
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO customers VALUES (?, ?, ?, ?)",
+                [(normalize_email(email), contact_id, name, now)
+                 for email, contact_id, name in entries if email and contact_id]
+            )
+
+    def put_absent(self, email: str):
+        """Remember, briefly, that Zoho has no contact for this email"""
+        with self._lock, self.conn:
+            # Never overwrite a known contact with a negative answer
+            self.conn.execute(
+                "INSERT INTO customers VALUES (?, NULL, NULL, ?) "
+                "ON CONFLICT(email) DO UPDATE SET updated_at = excluded.updated_at "
+                "WHERE contact_id IS NULL",
+                (normalize_email(email), time.time())
+            )
+
+    def forget(self, email: str):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM customers WHERE email = ?", (normalize_email(email),))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM customers WHERE contact_id IS NOT NULL"
+            ).fetchone()[0]
+
+    # ==========================================
+    # WARMING
+    # ==========================================
+
+    def warmed_at(self) -> float:
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'warmed_at'").fetchone()
+        return float(row[0]) if row else 0.0
+
+    def _set_warmed_at(self, value: float):
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('warmed_at', ?)", (str(value),))
+
+    async def warm(self) -> int:
+        """Load every Zoho customer contact; returns how many were stored"""
+        started = time.time()
+        stored = 0
+        page = 1
+        while True:
+            data = await zoho.get_json("contacts", {
+                "contact_type": "customer",
+                "page": page,
+                "per_page": CONTACTS_PER_PAGE,
+            })
+            contacts = data.get("contacts", [])
+            entries = [
+                (c.get("email"), c.get("contact_id"), c.get("contact_name"))
+                for c in contacts if c.get("email")
+            ]
+            await asyncio.to_thread(self.put_many, entries)
+            stored += len(entries)
+            if not data.get("page_context", {}).get("has_more_page"):
+                break
+            page += 1
+        await asyncio.to_thread(self._set_warmed_at, started)
+        return stored
+
+    async def warm_if_stale(self, max_age: float = CUSTOMER_CACHE_MAX_AGE):
+        """Warm unless a recent warm exists or another worker is warming"""
+        if not zoho.configured or time.time() - await asyncio.to_thread(self.warmed_at) < max_age:
+            return
+        fd = os.open(self.path.with_name(self.path.name + ".warm.lock"),
+                     os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return
+            if time.time() - await asyncio.to_thread(self.warmed_at) < max_age:
+                return
+            count = await self.warm()
+            print(f"Customer cache warmed: {count} contacts")
+        except Exception as e:
+            print(f"Customer cache warm failed: {e}")
+        finally:
+            os.close(fd)
+
+
+# Process-wide cache
+customers = CustomerCache()
+
+
+async def main():
+    async with zoho:
+        if not zoho.configured:
+            print("\nERROR: Missing Zoho credentials in .env file")
+            return
+        count = await customers.warm()
+        print(f"Cached {count} customers in {customers.path}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,123 @@
+"""
+Home & Verse - Diversified Ranking
+===================================
+Spreads a category's popularity order across keyword groups so a listing
+doesn't open with twenty lookalike products (e.g. Christmas: lights,
+houses, santas, candles... in turn).
+
+Rules are configured per category in DIVERSITY_RULES:
+- A product goes in the first group with a keyword in its name; a group
+  with no keywords catches everything else.
+- Each round, a group places up to `weight` products.
+- `max_run` caps how many products from one group can appear back to
+  back while other groups still have products.
+
+Orders are cached per (category, filter) for the lifetime of a catalog
+snapshot, so a reload of products or rankings recomputes them.
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class KeywordGroup:
+    name: str
+    keywords: tuple = ()  # empty = catch-all
+    weight: int = 1
+    max_run: Optional[int] = None
+
+    def __post_init__(self):
+        # interleave() places `weight` products per round - 0 would never finish
+        if self.weight < 1:
+            raise ValueError(f"Group {self.name!r}: weight must be at least 1")
+
+
+def keyword_groups(keywords: list, **catch_all) -> tuple:
+    """One weight-1 group per keyword, plus an 'other' catch-all group"""
+    return tuple(KeywordGroup(k, (k,)) for k in keywords) + (KeywordGroup("other", (), **catch_all),)
+
+
+# Lowercase category -> groups, in interleave order
+DIVERSITY_RULES = {
+    "christmas": keyword_groups(
+        ['light', 'house', 'santa', 'christmas', 'candle', 'star', 'angel', 'tree']
+    ),
+}
+
+
+def interleave(groups: list[list], rule: tuple) -> list:
+    """Weighted round-robin over groups, honouring each group's max_run"""
+    queues = [list(reversed(g)) for g in groups]  # pop() from the end = next item
+    remaining = sum(len(q) for q in queues)
+    result = []
+    last = None
+    run = 0
+
+    while remaining:
+        for i, queue in enumerate(queues):
+            group = rule[i]
+            for _ in range(group.weight):
+                if not queue:
+                    break
+                if i == last and group.max_run and run >= group.max_run \
+                        and remaining > len(queue):
+                    break
+                result.append(queue.pop())
+                remaining -= 1
+                run = run + 1 if i == last else 1
+                last = i
+    return result
+
+
+class DiversifiedRanking:
+    """Per-snapshot diversified orders, built lazily and cached"""
+
+    def __init__(self, products, popularity_order: tuple, rules: dict = DIVERSITY_RULES):
+        self.rules = rules
+        self.popularity_order = popularity_order
+        self._cache = {}
+        self._lock = threading.Lock()
+
+        # Group of every product under every rule, decided once from its name
+        self.group_of = {}
+        for category, rule in rules.items():
+            assignment = {}
+            for p in products:
+                name = (p.get('name') or '').lower()
+                for i, group in enumerate(rule):
+                    if not group.keywords or any(k in name for k in group.keywords):
+                        assignment[p.get('sku', '')] = i
+                        break
+            self.group_of[category] = assignment
+
+    def has_rule(self, category: Optional[str]) -> bool:
+        return bool(category) and category.lower() in self.rules
+
+    def _build(self, category: str, skus) -> tuple:
+        rule = self.rules[category]
+        assignment = self.group_of[category]
+        groups = [[] for _ in rule]
+        for sku in self.popularity_order:
+            if sku in skus and sku in assignment:
+                groups[assignment[sku]].append(sku)
+        return tuple(interleave(groups, rule))
+
+    def order(self, category: str, skus, cache_key: Optional[tuple] = None) -> tuple:
+        """
+        Diversified popularity order of `skus` for a category.
+        Pass a cache_key describing the filters behind `skus` to reuse the
+        result for later requests with the same filters.
+        """
+        category = category.lower()
+        if cache_key is None:
+            return self._build(category, skus)
+
+        key = (category, cache_key)
+        cached = self._cache.get(key)
+        if cached is None:
+            cached = self._build(category, skus)
+            with self._lock:
+                self._cache[key] = cached
+        return cached
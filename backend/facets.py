@@ -0,0 +1,121 @@
+"""
+Home & Verse - Faceted Counts
+==============================
+Brand, category, price-band and stock counts for the current
+/api/products filter set, so one request can drive a whole listing page.
+
+Every facet value is a bitset (a Python int, bit i = product i in catalog
+order) built once per snapshot. Counting is an AND plus a popcount per
+value, with no scan of product dicts.
+
+Brand and category counts ignore their own filter (picking a brand still
+shows how many products the other brands have); price and stock counts
+honour every filter except stock, which shows both in/out counts.
+"""
+
+from typing import Optional
+
+# (label, min inclusive, max exclusive) - None = unbounded
+PRICE_BANDS = [
+    ("Under £15", None, 15),
+    ("£15 - £30", 15, 30),
+    ("£30 - £50", 30, 50),
+    ("£50 - £100", 50, 100),
+    ("£100+", 100, None),
+]
+
+
+def in_band(price: float, low: Optional[float], high: Optional[float]) -> bool:
+    return (low is None or price >= low) and (high is None or price < high)
+
+
+class FacetIndex:
+    """Per-snapshot bitsets for every facet value"""
+
+    def __init__(self, products):
+        self.position = {}
+        self.brands = {}        # lowercase -> bitset
+        self.brand_names = {}   # lowercase -> display name
+        self.categories = {}
+        self.category_names = {}
+        self.price_bands = [0] * len(PRICE_BANDS)
+        self.in_stock = 0
+        self.has_image = 0
+
+        for i, p in enumerate(products):
+            bit = 1 << i
+            self.position[p.get("sku", "")] = i
+
+            brand = p.get("brand", "")
+            key = brand.lower()
+            self.brands[key] = self.brands.get(key, 0) | bit
+            self.brand_names.setdefault(key, brand)
+
+            for category in p.get("categories", [p.get("category", "")]):
+                key = category.lower()
+                self.categories[key] = self.categories.get(key, 0) | bit
+                self.category_names.setdefault(key, category)
+
+            price = p.get("price", 0) or 0
+            for b, (_label, low, high) in enumerate(PRICE_BANDS):
+                if in_band(price, low, high):
+                    self.price_bands[b] |= bit
+                    break
+
+            if p.get("in_stock", False):
+                self.in_stock |= bit
+            if p.get("has_image", False):
+                self.has_image |= bit
+
+        self.all = (1 << len(products)) - 1
+
+    def bits_for(self, skus) -> int:
+        """Bitset for a collection of SKUs"""
+        bits = 0
+        position = self.position
+        for sku in skus:
+            bits |= 1 << position[sku]
+        return bits
+
+    def counts(self, brand: Optional[str] = None, category: Optional[str] = None,
+               in_stock_only: bool = False, with_images_only: bool = False,
+               within=None) -> dict:
+        """
+        Facet counts for a filter set. `within` restricts everything to a
+        collection of SKUs (e.g. search matches).
+        """
+        base = self.all
+        if with_images_only:
+            base &= self.has_image
+        if within is not None:
+            base &= self.bits_for(within)
+
+        brand_bits = self.brands.get(brand.lower(), 0) if brand else self.all
+        category_bits = self.categories.get(category.lower(), 0) if category else self.all
+        stock_bits = self.in_stock if in_stock_only else self.all
+
+        without_brand = base & category_bits & stock_bits
+        without_category = base & brand_bits & stock_bits
+        without_stock = base & brand_bits & category_bits
+        matched = without_stock & stock_bits
+
+        return {
+            "brands": [
+                {"name": self.brand_names[key], "count": count}
+                for key, bits in sorted(self.brands.items(), key=lambda kv: self.brand_names[kv[0]])
+                if (count := (bits & without_brand).bit_count())
+            ],
+            "categories": [
+                {"name": self.category_names[key], "count": count}
+                for key, bits in sorted(self.categories.items(), key=lambda kv: self.category_names[kv[0]])
+                if (count := (bits & without_category).bit_count())
+            ],
+            "price_bands": [
+                {"label": label, "min": low, "max": high, "count": (bits & matched).bit_count()}
+                for (label, low, high), bits in zip(PRICE_BANDS, self.price_bands)
+            ],
+            "stock": {
+                "in_stock": (without_stock & self.in_stock).bit_count(),
+                "out_of_stock": (without_stock & ~self.in_stock).bit_count()
+            }
+        }
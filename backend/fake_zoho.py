@@ -0,0 +1,226 @@
+"""
+Home & Verse - Fake Zoho Server
+================================
+A local stand-in for accounts.zoho.eu and the Zoho Inventory API, for
+exercising zoho_client.py, zoho_orders.py and the import/bestsellers
+scripts without touching the real organisation.
+
+Items come from data/products.json. Contacts and sales orders live in
+memory (`reset_state()` clears them). GET /_stats reports token
+refreshes, requests and distinct client connections (to see pooling and
+single-flight refresh at work). POST /_expire revokes the current token,
+so the next API call gets a 401.
+
+Usage:
+    cd backend
+    python3 fake_zoho.py                 # http://127.0.0.1:8099
+
+    # in another shell
+    export ZOHO_ACCOUNTS_URL=http://127.0.0.1:8099
+    export ZOHO_API_URL=http://127.0.0.1:8099/inventory/v1
+    export ZOHO_CLIENT_ID=fake ZOHO_CLIENT_SECRET=fake ZOHO_REFRESH_TOKEN=fake ZOHO_ORG_ID=1
+    python3 check_brands.py
+
+The tests (tests/test_zoho.py) mount the app in-process instead, through
+httpx.ASGITransport.
+"""
+
+import itertools
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+PRODUCTS_FILE = Path("data/products.json")
+FAKE_ZOHO_PORT = int(os.getenv("FAKE_ZOHO_PORT", "8099"))
+FAKE_TOKEN_TTL = int(os.getenv("FAKE_ZOHO_TOKEN_TTL", "3600"))
+
+app = FastAPI(title="Fake Zoho")
+
+ids = itertools.count(900000000000000001)
+state = {}
+
+
+def reset_state():
+    """Forget every token, contact and sales order (tests call this first)"""
+    state.update({
+        "token": None,
+        "token_refreshes": 0,
+        "requests": 0,
+        "connections": set(),
+        "contacts": {},      # contact_id -> contact
+        "salesorders": {},   # salesorder_id -> salesorder
+    })
+
+
+reset_state()
+
+
+def load_items() -> list[dict]:
+    if not PRODUCTS_FILE.exists():
+        return []
+    with open(PRODUCTS_FILE) as f:
+        products = json.load(f).get("products", [])
+    return [
+        {
+            "item_id": p.get("id") or str(next(ids)),
+            "sku": p.get("sku"),
+            "name": p.get("name"),
+            "brand": p.get("brand"),
+            "rate": p.get("price"),
+            "purchase_rate": p.get("trade_price"),
+            "stock_on_hand": p.get("stock", 0),
+            "ean": p.get("ean"),
+            "status": "active",
+        }
+        for p in products
+    ]
+
+
+ITEMS = load_items()
+
+
+def zoho_error(status_code: int, code: int, message: str) -> JSONResponse:
+    return JSONResponse(status_code=status_code, content={"code": code, "message": message})
+
+
+def paginate(records: list, page: int, per_page: int) -> tuple:
+    start = (page - 1) * per_page
+    return records[start:start + per_page], {
+        "page": page,
+        "per_page": per_page,
+        "has_more_page": start + per_page < len(records),
+    }
+
+
+@app.middleware("http")
+async def check_auth(request: Request, call_next):
+    state["requests"] += 1
+    if request.client:
+        state["connections"].add((request.client.host, request.client.port))
+
+    if request.url.path.startswith("/inventory/v1/"):
+        expected = f"Zoho-oauthtoken {state['token']}"
+        if state["token"] is None or request.headers.get("authorization") != expected:
+            return zoho_error(401, 57, "You are not authorized to perform this operation")
+        if not request.query_params.get("organization_id"):
+            return zoho_error(400, 6041, "organization_id is required")
+    return await call_next(request)
+
+
+# ==========================================
+# OAUTH
+# ==========================================
+
+@app.post("/oauth/v2/token")
+async def token(refresh_token: str = "", client_id: str = "", client_secret: str = "",
+                grant_type: str = ""):
+    if grant_type != "refresh_token" or not (refresh_token and client_id and client_secret):
+        return JSONResponse({"error": "invalid_client"})
+    state["token_refreshes"] += 1
+    state["token"] = f"fake-token-{state['token_refreshes']}"
+    return {"access_token": state["token"], "expires_in": FAKE_TOKEN_TTL, "token_type": "Bearer"}
+
+
+# ==========================================
+# INVENTORY
+# ==========================================
+
+@app.get("/inventory/v1/organizations")
+async def organizations(organization_id: str):
+    return {"code": 0, "organizations": [{"organization_id": organization_id, "name": "Fake Org"}]}
+
+
+@app.get("/inventory/v1/items")
+async def items(sku: Optional[str] = None, page: int = 1, per_page: int = 200):
+    records = [i for i in ITEMS if i["sku"] == sku] if sku else ITEMS
+    records, page_context = paginate(records, page, per_page)
+    return {"code": 0, "items": records, "page_context": page_context}
+
+
+@app.get("/inventory/v1/items/{item_id}/image")
+async def item_image(item_id: str):
+    # A minimal valid JPEG-ish payload over the importer's 100-byte threshold
+    return Response(content=b"\xff\xd8\xff\xe0" + b"\0" * 200 + b"\xff\xd9", media_type="image/jpeg")
+
+
+@app.get("/inventory/v1/contacts")
+async def list_contacts(email: Optional[str] = None, page: int = 1, per_page: int = 200):
+    contacts = [c for c in state["contacts"].values() if not email or c["email"] == email]
+    contacts, page_context = paginate(contacts, page, per_page)
+    return {"code": 0, "contacts": contacts, "page_context": page_context}
+
+
+@app.post("/inventory/v1/contacts")
+async def create_contact(request: Request):
+    data = await request.json()
+    contact = {**data, "contact_id": str(next(ids))}
+    state["contacts"][contact["contact_id"]] = contact
+    return JSONResponse(status_code=201, content={"code": 0, "contact": contact})
+
+
+@app.get("/inventory/v1/salesorders")
+async def list_salesorders(reference_number: Optional[str] = None, page: int = 1,
+                           per_page: int = 200):
+    records = [o for o in state["salesorders"].values()
+               if not reference_number or o.get("reference_number") == reference_number]
+    records, page_context = paginate(records, page, per_page)
+    return {"code": 0, "salesorders": records, "page_context": page_context}
+
+
+@app.get("/inventory/v1/salesorders/{salesorder_id}")
+async def get_salesorder(salesorder_id: str):
+    order = state["salesorders"].get(salesorder_id)
+    if order is None:
+        return zoho_error(404, 1002, "Sales order does not exist")
+    return {"code": 0, "salesorder": order}
+
+
+@app.post("/inventory/v1/salesorders")
+async def create_salesorder(request: Request):
+    data = await request.json()
+    known = {i["item_id"] for i in ITEMS}
+    for line in data.get("line_items", []):
+        if line.get("item_id") not in known:
+            return zoho_error(400, 1001, f"Item {line.get('item_id')} does not exist")
+
+    salesorder_id = str(next(ids))
+    order = {
+        **data,
+        "salesorder_id": salesorder_id,
+        "salesorder_number": f"SO-{len(state['salesorders']) + 1:05d}",
+        "total": round(sum(l["rate"] * l["quantity"] for l in data.get("line_items", []))
+                       + data.get("shipping_charge", 0), 2),
+        "status": "draft",
+    }
+    state["salesorders"][salesorder_id] = order
+    return JSONResponse(status_code=201, content={"code": 0, "salesorder": order})
+
+
+# ==========================================
+# TEST CONTROLS
+# ==========================================
+
+@app.get("/_stats")
+async def stats():
+    return {
+        "token_refreshes": state["token_refreshes"],
+        "requests": state["requests"],
+        "connections": len(state["connections"]),
+        "contacts": len(state["contacts"]),
+        "salesorders": len(state["salesorders"]),
+    }
+
+
+@app.post("/_expire")
+async def expire_token():
+    state["token"] = "revoked"
+    return {"status": "expired"}
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="127.0.0.1", port=FAKE_ZOHO_PORT)
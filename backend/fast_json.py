@@ -0,0 +1,43 @@
+"""
+Home & Verse - Fast JSON Responses
+===================================
+Catalog payloads are built from plain dicts, lists, strings, numbers and
+booleans that are already JSON-safe, so FastAPI's `jsonable_encoder` pass
+over them is wasted work. Endpoints that return `FastJSONResponse(...)`
+skip it and serialize once, with orjson when it is installed.
+
+The output matches JSONResponse (compact separators, UTF-8, no ASCII
+escaping). Only use it for JSON-safe content: pydantic models, datetimes
+etc. still need the normal return path.
+
+Benchmark: python3 bench_json.py
+"""
+
+import json
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # stdlib json until orjson is installed
+    orjson = None
+
+
+def dump_json(content) -> bytes:
+    """Serialize exactly like FastAPI's JSONResponse"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse for already JSON-safe content, rendered with dump_json"""
+
+    def render(self, content) -> bytes:
+        return dump_json(content)
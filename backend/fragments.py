@@ -0,0 +1,105 @@
+"""
+Home & Verse - Pre-rendered Product JSON
+=========================================
+Each product's JSON for the two projections listings use:
+
+- full      every field, plus popularity_score
+- listing   LISTING_FIELDS only (fields=listing), for product cards
+
+A listing response is then the selected fragments joined in order inside
+a small envelope (count, pagination, facets) that is encoded per request.
+popularity_score is fixed for a snapshot, so it is part of the fragment.
+
+Only the listing projection is rendered ahead (lazily, once per snapshot)
+- a private table of the full records would double each worker's heap.
+Full fragments are made per request: from a mapped snapshot they are the
+stored record bytes with popularity_score spliced in (no decoding, and
+the records stay in the shared page cache); otherwise the product is
+encoded. Either way they are byte-identical to serializing the product
+dicts.
+"""
+
+import threading
+from typing import Optional
+
+from fast_json import dump_json
+
+# Product card projection (sku is always included by parse_fields)
+LISTING_FIELDS = frozenset({
+    "sku", "name", "brand", "price", "image_url", "in_stock", "has_image",
+    "categories", "category", "slug", "popularity_score",
+})
+
+POPULARITY_KEY = b'"popularity_score":'
+
+
+class ProductFragments:
+    """Per-snapshot product JSON bytes, for the full and listing projections"""
+
+    def __init__(self, products, popularity):
+        self.products = products      # CompactProducts / MappedCatalog
+        self.popularity = popularity  # sku -> score
+        # MappedCatalog: stored records are already dump_json output. One that
+        # has a popularity_score of its own would be replaced in place, so
+        # those catalogs are encoded instead.
+        self._record = None
+        if hasattr(products, "record") and not products.records_contain(POPULARITY_KEY):
+            self._record = products.record
+        self._suffixes = {}  # (type, score) -> b',"popularity_score":<score>}'
+        self._listing: Optional[list] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def supports(fields: Optional[set]) -> bool:
+        return fields is None or fields == LISTING_FIELDS
+
+    def render(self, positions, skus, fields: Optional[set]) -> list[bytes]:
+        """Fragments for the products at these catalog positions (with their SKUs)"""
+        if fields is None:
+            return [self._full(i, sku) for i, sku in zip(positions, skus)]
+        table = self._listing_table()
+        return [table[i] for i in positions]
+
+    def _full(self, i: int, sku: str) -> bytes:
+        score = self.popularity(sku)
+        record = self._record(i) if self._record is not None else None
+        if record is not None and len(record) > 2:
+            # '{...}' -> '{...,"popularity_score":N}'
+            key = (type(score), score)
+            suffix = self._suffixes.get(key)
+            if suffix is None:
+                suffix = self._suffixes[key] = b"," + POPULARITY_KEY + dump_json(score) + b"}"
+            return b"".join((record[:-1], suffix))
+        product = self.products.materialize(i)
+        product["popularity_score"] = score
+        return dump_json(product)
+
+    def _listing_table(self) -> list[bytes]:
+        """Listing fragments for every product, in catalog order"""
+        table = self._listing
+        if table is None:
+            with self._lock:
+                table = self._listing
+                if table is None:
+                    table = self._listing = self._render_listing()
+        return table
+
+    def _render_listing(self) -> list[bytes]:
+        table = []
+        materialize = self.products.materialize
+        for i in range(len(self.products)):
+            product = materialize(i, LISTING_FIELDS)
+            product["popularity_score"] = self.popularity(product["sku"])
+            table.append(dump_json(product))
+        return table
+
+
+def render_listing(fragments: list[bytes], envelope: dict) -> bytes:
+    """
+    {"products": [...fragments...], **envelope} as JSON bytes - the same
+    output as dump_json on the equivalent dict.
+    """
+    body = b'{"products":[' + b",".join(fragments) + b"]"
+    if not envelope:
+        return body + b"}"
+    return body + b"," + dump_json(envelope)[1:]
@@ -10,74 +10,26 @@ Usage:
 """
 
 import asyncio
-import httpx
 import json
-import os
 from pathlib import Path
 from datetime import datetime, timedelta
 from collections import defaultdict
 from dotenv import load_dotenv
 
+from zoho_client import zoho
+
 # Load environment variables
 load_dotenv()
 
-ZOHO_CLIENT_ID = os.getenv("ZOHO_CLIENT_ID")
-ZOHO_CLIENT_SECRET = os.getenv("ZOHO_CLIENT_SECRET")
-ZOHO_REFRESH_TOKEN = os.getenv("ZOHO_REFRESH_TOKEN")
-ZOHO_ORG_ID = os.getenv("ZOHO_ORG_ID")
-
 # Paths
 DATA_DIR = Path("data")
 BESTSELLERS_FILE = DATA_DIR / "bestsellers.json"
 PRODUCTS_FILE = DATA_DIR / "products.json"
 
-# Token cache
-_access_token = None
-_token_expires = None
-
-
-async def get_access_token():
-    """Get or refresh Zoho access token"""
-    global _access_token, _token_expires
-    
-    if _access_token and _token_expires and datetime.now().timestamp() < _token_expires:
-        return _access_token
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            "https://accounts.zoho.eu/oauth/v2/token",
-            params={
-                "refresh_token": ZOHO_REFRESH_TOKEN,
-                "client_id": ZOHO_CLIENT_ID,
-                "client_secret": ZOHO_CLIENT_SECRET,
-                "grant_type": "refresh_token"
-            }
-        )
-        response.raise_for_status()
-        data = response.json()
-        
-        _access_token = data["access_token"]
-        _token_expires = datetime.now().timestamp() + data.get("expires_in", 3600) - 60
-        
-        return _access_token
-
 
 async def zoho_get(endpoint: str, params: dict = None):
     """Make authenticated GET request to Zoho"""
-    token = await get_access_token()
-    
-    if params is None:
-        params = {}
-    params["organization_id"] = ZOHO_ORG_ID
-    
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        response = await client.get(
-            f"https://www.zohoapis.eu/inventory/v1/{endpoint}",
-            headers={"Authorization": f"Zoho-oauthtoken {token}"},
-            params=params
-        )
-        response.raise_for_status()
-        return response.json()
+    return await zoho.get_json(endpoint, params, timeout=60.0)
 
 
 async def fetch_sales_orders(start_date: str, end_date: str):
@@ -144,7 +96,7 @@ async def generate_bestsellers():
     print("=" * 60)
     
     # Check credentials
-    if not all([ZOHO_CLIENT_ID, ZOHO_CLIENT_SECRET, ZOHO_REFRESH_TOKEN, ZOHO_ORG_ID]):
+    if not zoho.configured:
         print("\nERROR: Missing Zoho credentials in .env file")
         return
     
@@ -318,5 +270,10 @@ async def generate_bestsellers():
         print(f"  {brand}: {count}")
 
 
+async def main():
+    async with zoho:  # closes the connection pool when done
+        await generate_bestsellers()
+
+
 if __name__ == "__main__":
-    asyncio.run(generate_bestsellers())
+    asyncio.run(main())
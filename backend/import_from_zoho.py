@@ -13,23 +13,19 @@ Options:
 """
 
 import asyncio
-import httpx
 import json
-import os
 import re
 import sys
 from pathlib import Path
 from datetime import datetime
 from dotenv import load_dotenv
 
+from catalog_snapshot import write_catalog_snapshot
+from zoho_client import zoho
+
 # Load environment variables
 load_dotenv()
 
-ZOHO_CLIENT_ID = os.getenv("ZOHO_CLIENT_ID")
-ZOHO_CLIENT_SECRET = os.getenv("ZOHO_CLIENT_SECRET")
-ZOHO_REFRESH_TOKEN = os.getenv("ZOHO_REFRESH_TOKEN")
-ZOHO_ORG_ID = os.getenv("ZOHO_ORG_ID")
-
 # Command line options
 IN_STOCK_ONLY = "--in-stock-only" in sys.argv
 SKIP_IMAGES = "--skip-images" in sys.argv
@@ -229,54 +225,12 @@ DATA_DIR = Path("data")
 IMAGES_DIR = DATA_DIR / "images"
 PRODUCTS_FILE = DATA_DIR / "products.json"
 STOCK_FILE = DATA_DIR / "stock.json"
-
-# Token cache
-_access_token = None
-_token_expires = None
-
-
-async def get_access_token():
-    """Get or refresh Zoho access token"""
-    global _access_token, _token_expires
-    
-    if _access_token and _token_expires and datetime.now().timestamp() < _token_expires:
-        return _access_token
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            "https://accounts.zoho.eu/oauth/v2/token",
-            params={
-                "refresh_token": ZOHO_REFRESH_TOKEN,
-                "client_id": ZOHO_CLIENT_ID,
-                "client_secret": ZOHO_CLIENT_SECRET,
-                "grant_type": "refresh_token"
-            }
-        )
-        response.raise_for_status()
-        data = response.json()
-        
-        _access_token = data["access_token"]
-        _token_expires = datetime.now().timestamp() + data.get("expires_in", 3600) - 60
-        
-        return _access_token
+SNAPSHOT_FILE = DATA_DIR / "catalog.bin"
 
 
 async def zoho_get(endpoint: str, params: dict = None):
     """Make authenticated GET request to Zoho"""
-    token = await get_access_token()
-    
-    if params is None:
-        params = {}
-    params["organization_id"] = ZOHO_ORG_ID
-    
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.get(
-            f"https://www.zohoapis.eu/inventory/v1/{endpoint}",
-            headers={"Authorization": f"Zoho-oauthtoken {token}"},
-            params=params
-        )
-        response.raise_for_status()
-        return response.json()
+    return await zoho.get_json(endpoint, params)
 
 
 async def download_image(item_id: str, sku: str) -> bool:
@@ -292,22 +246,15 @@ async def download_image(item_id: str, sku: str) -> bool:
     if image_path.exists() and image_path.stat().st_size > 100:
         return True
     
-    token = await get_access_token()
-    
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(
-                f"https://www.zohoapis.eu/inventory/v1/items/{item_id}/image",
-                headers={"Authorization": f"Zoho-oauthtoken {token}"},
-                params={"organization_id": ZOHO_ORG_ID}
-            )
-            
-            if response.status_code == 200 and len(response.content) > 100:
-                with open(image_path, "wb") as f:
-                    f.write(response.content)
-                return True
-            else:
-                return False
+        response = await zoho.request("GET", f"items/{item_id}/image")
+        
+        if response.status_code == 200 and len(response.content) > 100:
+            with open(image_path, "wb") as f:
+                f.write(response.content)
+            return True
+        else:
+            return False
     except Exception as e:
         return False
 
@@ -445,7 +392,7 @@ async def import_products():
         print("Mode: SKIPPING IMAGES")
     
     # Check credentials
-    if not all([ZOHO_CLIENT_ID, ZOHO_CLIENT_SECRET, ZOHO_REFRESH_TOKEN, ZOHO_ORG_ID]):
+    if not zoho.configured:
         print("\nERROR: Missing Zoho credentials in .env file")
         return
     
@@ -606,6 +553,9 @@ async def import_products():
         }, f, indent=2)
     print(f"   {PRODUCTS_FILE}: {len(products)} products")
     
+    write_catalog_snapshot(products, SNAPSHOT_FILE, PRODUCTS_FILE)
+    print(f"   {SNAPSHOT_FILE}: binary catalog snapshot")
+    
     with open(STOCK_FILE, "w") as f:
         json.dump({
             "stock": stock_data,
@@ -674,5 +624,10 @@ async def import_products():
             print(f"  {p['sku']}: {p['name'][:30]}... [{cats}]")
 
 
+async def main():
+    async with zoho:  # closes the connection pool when done
+        await import_products()
+
+
 if __name__ == "__main__":
-    asyncio.run(import_products())
+    asyncio.run(main())
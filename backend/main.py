@@ -4,19 +4,38 @@ Home & Verse - Backend API
 Serves products from local JSON files (fast, no API calls for browsing).
 """
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, Response
+from fastapi.responses import FileResponse, JSONResponse, Response
 from starlette.middleware.base import BaseHTTPMiddleware
 from pydantic import BaseModel
 from typing import Optional, List
-import json
+from contextlib import asynccontextmanager
+from email.utils import formatdate, parsedate_to_datetime
+import asyncio
+import base64
+import hashlib
+import hmac
 import os
 import stripe
+import time
 from pathlib import Path
 from dotenv import load_dotenv
 
+from catalog import CatalogStore
+from compression import APICompressionMiddleware
+from customer_cache import customers
+from fast_json import FastJSONResponse, dump_json
+from fragments import LISTING_FIELDS, render_listing
+from order_outbox import outbox
+from response_cache import ResponseCache, build_cached_response
+from search_index import TOP_RESULTS
+from shared_catalog import SharedCatalogStore
+from static_index import StaticIndex
+from zoho_client import zoho
+
 
 # Cache control middleware
 class CacheControlMiddleware(BaseHTTPMiddleware):
@@ -39,6 +58,76 @@ class CacheControlMiddleware(BaseHTTPMiddleware):
         
         return response
 
+
+# Catalog endpoints whose output depends only on the query and catalog version
+CATALOG_API_PREFIXES = (
+    '/api/products', '/api/search/', '/api/brands', '/api/categories',
+    '/api/stats', '/api/bestsellers', '/api/rankings/'
+)
+
+
+def catalog_etag(version: str, request: Request) -> str:
+    """Strong ETag for a catalog query (before content encoding)"""
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    digest = hashlib.sha1(f"{version}|{request.url.path}|{query}".encode()).hexdigest()
+    return f'"{digest[:24]}"'
+
+
+def match_etag(if_none_match: str, etag: str) -> Optional[str]:
+    """
+    The If-None-Match entry that matches our ETag, or None.
+    Ignores the -br/-gzip suffix we add per content encoding.
+    """
+    if if_none_match.strip() == "*":
+        return etag
+    base = etag.strip('"')
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip().removeprefix("W/")
+        if candidate.strip('"').split("-", 1)[0] == base:
+            return candidate
+    return None
+
+
+# Conditional GET middleware for the catalog API
+class CatalogETagMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        path = request.url.path
+        if request.method not in ('GET', 'HEAD') or not path.startswith(CATALOG_API_PREFIXES):
+            return await call_next(request)
+        
+        snapshot = catalog.get()
+        etag = catalog_etag(snapshot.version, request)
+        last_modified = formatdate(snapshot.modified_at, usegmt=True)
+        headers = {
+            'ETag': etag,
+            'Last-Modified': last_modified,
+            'Cache-Control': 'no-cache',
+            'Vary': 'Accept-Encoding'
+        }
+        
+        # Answer revalidations without running filter/sort at all
+        if_none_match = request.headers.get('if-none-match')
+        if if_none_match is not None:
+            matched = match_etag(if_none_match, etag)
+            if matched:
+                return Response(status_code=304, headers={**headers, 'ETag': matched})
+        elif 'if-modified-since' in request.headers:
+            try:
+                since = parsedate_to_datetime(request.headers['if-modified-since']).timestamp()
+            except (TypeError, ValueError):
+                since = None
+            if since is not None and int(snapshot.modified_at) <= since:
+                return Response(status_code=304, headers=headers)
+        
+        response = await call_next(request)
+        if response.status_code == 200:
+            encoding = response.headers.get('content-encoding')
+            if encoding:
+                headers['ETag'] = f'"{etag[1:-1]}-{encoding}"'
+            response.headers.update(headers)
+        return response
+
+
 # Load environment variables
 load_dotenv()
 
@@ -56,12 +145,56 @@ PRODUCTS_FILE = DATA_DIR / "products.json"
 STOCK_FILE = DATA_DIR / "stock.json"
 RANKINGS_FILE = DATA_DIR / "rankings.json"
 BESTSELLERS_FILE = DATA_DIR / "bestsellers.json"
+CATALOG_SNAPSHOT_FILE = DATA_DIR / "catalog.bin"  # mmap'd when in sync with products.json
+
+# In-memory catalog - loaded once, swapped when the data files change.
+# With several uvicorn workers, CATALOG_SHARED=1 publishes each catalog
+# version once per host and every worker switches to it together.
+if os.getenv("CATALOG_SHARED") == "1":
+    catalog = SharedCatalogStore(PRODUCTS_FILE, STOCK_FILE, RANKINGS_FILE, BESTSELLERS_FILE)
+else:
+    catalog = CatalogStore(PRODUCTS_FILE, STOCK_FILE, RANKINGS_FILE, BESTSELLERS_FILE,
+                           CATALOG_SNAPSHOT_FILE)
+
+# Serialized + compressed /api/products listings, per catalog version
+listing_cache = ResponseCache()
+
+
+# Reload the catalog in the background when the data files change
+CATALOG_WATCH = os.getenv("CATALOG_WATCH", "1") == "1"
+
+# Bearer token for /admin endpoints (admin API disabled when unset)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    catalog.load()
+    if CATALOG_WATCH:
+        catalog.start_watching()
+    zoho.start_renewal()
+    warming = asyncio.create_task(customers.warm_if_stale())
+    outbox.start_worker()
+    yield
+    warming.cancel()
+    await outbox.stop_worker()
+    catalog.stop_watching()
+    await zoho.aclose()
+    customers.close()
+    outbox.close()
+
+
+app = FastAPI(title="Home & Verse API", version="1.0", lifespan=lifespan)
 
-app = FastAPI(title="Home & Verse API", version="1.0")
+# Compress JSON API responses (inside the ETag middleware, which tags the encoding)
+app.add_middleware(APICompressionMiddleware)
 
 # Add cache control middleware
 app.add_middleware(CacheControlMiddleware)
 
+# ETag / Last-Modified revalidation for catalog endpoints
+app.add_middleware(CatalogETagMiddleware)
+
 # CORS for frontend
 app.add_middleware(
     CORSMiddleware,
@@ -75,121 +208,21 @@ app.add_middleware(
 if (DATA_DIR / "images").exists():
     app.mount("/images", StaticFiles(directory=DATA_DIR / "images"), name="images")
 
-# Serve Vite dist folder (frontend)
+# Serve Vite dist folder (frontend), falling back to public/ - indexed once
+# at startup (and on /admin/reload) instead of probing the disk per request
 DIST_DIR = Path(__file__).parent.parent / "dist"
 PUBLIC_DIR = Path(__file__).parent.parent / "public"
-
-# Mount Vite assets folder
-if (DIST_DIR / "assets").exists():
-    app.mount("/assets", StaticFiles(directory=DIST_DIR / "assets"), name="assets")
-
-# Serve static files from public folder and dist
-@app.get("/manifest.json")
-async def get_manifest():
-    for dir in [DIST_DIR, PUBLIC_DIR]:
-        if (dir / "manifest.json").exists():
-            return FileResponse(dir / "manifest.json", media_type="application/manifest+json")
-    raise HTTPException(status_code=404)
-
-@app.get("/sw.js")
-async def get_service_worker():
-    for dir in [DIST_DIR, PUBLIC_DIR]:
-        if (dir / "sw.js").exists():
-            return FileResponse(dir / "sw.js", media_type="application/javascript")
-    raise HTTPException(status_code=404)
-
-@app.get("/favicon.svg")
-async def get_favicon_svg():
-    for dir in [DIST_DIR, PUBLIC_DIR]:
-        if (dir / "favicon.svg").exists():
-            return FileResponse(dir / "favicon.svg", media_type="image/svg+xml")
-    raise HTTPException(status_code=404)
-
-@app.get("/icon-192.png")
-async def get_icon_192():
-    for dir in [DIST_DIR, PUBLIC_DIR]:
-        if (dir / "icon-192.png").exists():
-            return FileResponse(dir / "icon-192.png", media_type="image/png")
-    raise HTTPException(status_code=404)
-
-@app.get("/icon-512.png")
-async def get_icon_512():
-    for dir in [DIST_DIR, PUBLIC_DIR]:
-        if (dir / "icon-512.png").exists():
-            return FileResponse(dir / "icon-512.png", media_type="image/png")
-    raise HTTPException(status_code=404)
-
-@app.get("/og-image.png")
-async def get_og_image():
-    for dir in [DIST_DIR, PUBLIC_DIR]:
-        if (dir / "og-image.png").exists():
-            return FileResponse(dir / "og-image.png", media_type="image/png")
-    raise HTTPException(status_code=404)
-
-@app.get("/logo.png")
-async def get_logo():
-    for dir in [DIST_DIR, PUBLIC_DIR]:
-        if (dir / "logo.png").exists():
-            return FileResponse(dir / "logo.png", media_type="image/png")
-    raise HTTPException(status_code=404)
-
-@app.get("/robots.txt")
-async def get_robots():
-    for dir in [DIST_DIR, PUBLIC_DIR]:
-        if (dir / "robots.txt").exists():
-            return FileResponse(dir / "robots.txt", media_type="text/plain")
-    raise HTTPException(status_code=404)
-
-@app.get("/sitemap.xml")
-async def get_sitemap():
-    for dir in [DIST_DIR, PUBLIC_DIR]:
-        if (dir / "sitemap.xml").exists():
-            return FileResponse(dir / "sitemap.xml", media_type="application/xml")
-    raise HTTPException(status_code=404)
-
-
-def load_products() -> list[dict]:
-    """Load products from local JSON file"""
-    if not PRODUCTS_FILE.exists():
-        return []
-    with open(PRODUCTS_FILE) as f:
-        data = json.load(f)
-    return data.get("products", [])
-
-
-def load_stock() -> dict:
-    """Load stock levels from local JSON file"""
-    if not STOCK_FILE.exists():
-        return {}
-    with open(STOCK_FILE) as f:
-        data = json.load(f)
-    return data.get("stock", {})
-
-
-def load_rankings() -> dict:
-    """Load popularity rankings from local JSON file"""
-    if not RANKINGS_FILE.exists():
-        return {}
-    with open(RANKINGS_FILE) as f:
-        data = json.load(f)
-    return data.get("rankings", {})
-
-
-def load_bestsellers() -> dict:
-    """Load bestsellers from local JSON file"""
-    if not BESTSELLERS_FILE.exists():
-        return {"bestsellers": [], "generated_at": None}
-    with open(BESTSELLERS_FILE) as f:
-        return json.load(f)
+static_files = StaticIndex(DIST_DIR, PUBLIC_DIR)
+app.router.routes.append(static_files.route())
 
 
 @app.get("/")
-async def serve_frontend():
+async def serve_frontend(request: Request):
     """Serve the main frontend from Vite dist"""
     # Try dist/index.html first (production build)
-    dist_html = PROJECT_ROOT / "dist" / "index.html"
-    if dist_html.exists():
-        return FileResponse(dist_html, media_type="text/html")
+    index_html = static_files.lookup("/index.html")
+    if index_html is not None:
+        return static_files.response(request.headers, index_html)
     # Fallback to preview.html for legacy
     preview_html = PROJECT_ROOT / "preview.html"
     if preview_html.exists():
@@ -200,234 +233,262 @@ async def serve_frontend():
 
 
 
+def encode_cursor(offset: int, version: str) -> str:
+    """Opaque pagination cursor (offset + catalog version)"""
+    return base64.urlsafe_b64encode(f"{offset}:{version}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, version: str) -> int:
+    """
+    Offset from a pagination cursor. Cursors from an older catalog version
+    are rejected (410) - the ordering they index into no longer exists.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        offset, cursor_version = base64.urlsafe_b64decode(padded).decode().split(":", 1)
+        offset = int(offset)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if cursor_version != version:
+        raise HTTPException(status_code=410, detail="Catalog changed - restart from the first page")
+    return offset
+
+
+def parse_fields(fields: Optional[str]) -> Optional[set]:
+    """Field names from a fields= parameter (sku is always included)"""
+    if not fields:
+        return None
+    if fields == "listing":
+        return set(LISTING_FIELDS)
+    return {"sku"} | {f.strip() for f in fields.split(",") if f.strip()}
+
+
+def page_products(snapshot, skus, fields: Optional[set]) -> list[dict]:
+    """Materialize a page of products (only the requested fields) with popularity_score"""
+    products = snapshot.products_ranked(skus, fields)
+    if fields is None or "popularity_score" in fields:
+        for product in products:
+            product["popularity_score"] = snapshot.popularity(product["sku"])
+    return products
+
+
+def render_products(snapshot, skus, fields: Optional[set], envelope: dict) -> bytes:
+    """
+    {"products": [...], **envelope} as JSON bytes - joined from pre-rendered
+    fragments for the full and listing projections
+    """
+    if snapshot.fragments.supports(fields):
+        return render_listing(snapshot.product_fragments(skus, fields), envelope)
+    return dump_json({"products": page_products(snapshot, skus, fields), **envelope})
+
+
 @app.get("/api/products")
 async def get_products(
+    request: Request,
     brand: Optional[str] = None,
     category: Optional[str] = None,
     search: Optional[str] = None,
     in_stock_only: bool = False,
     with_images_only: bool = True,  # Default to only showing products with images
-    sort: Optional[str] = None  # popularity, price-asc, price-desc, name
+    sort: Optional[str] = None,  # popularity, price-asc, price-desc, name
+    limit: Optional[int] = Query(None, ge=1),  # Page size (default: everything)
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,  # next_cursor from a previous page (overrides offset)
+    fields: Optional[str] = None,  # Comma-separated projection, e.g. sku,name,price,image_url,brand
+    facets: bool = False  # Include brand/category/price/stock counts for this filter set
 ):
-    """Get all products with optional filtering"""
-    products = load_products()
-    rankings = load_rankings()
-    
-    # Filter out products without images (default behavior)
-    if with_images_only:
-        products = [p for p in products if p.get("has_image", False)]
-    
-    if brand:
-        products = [p for p in products if p.get("brand", "").lower() == brand.lower()]
-    
-    if category:
-        # Support both old single category and new categories array
-        products = [
-            p for p in products 
-            if category.lower() in [c.lower() for c in p.get("categories", [p.get("category", "")])] 
-        ]
+    """Get all products with optional filtering, pagination and field projection"""
+    snapshot = catalog.get()
+    
+    if cursor:
+        offset = decode_cursor(cursor, snapshot.version)
+    wanted = parse_fields(fields)
     
+    # Free-text searches are unbounded - only cache the listing queries
     if search:
-        search_lower = search.lower()
-        products = [
-            p for p in products
-            if search_lower in p.get("name", "").lower()
-            or search_lower in p.get("description", "").lower()
-            or search_lower in p.get("sku", "").lower()
-        ]
+        body = query_products(snapshot, brand, category, search, in_stock_only,
+                              with_images_only, sort, limit, offset, wanted, facets)
+        return Response(content=body, media_type="application/json")
+    
+    # Only cache page-aligned requests; arbitrary offsets (e.g. offset=N
+    # with no limit, nearly the whole catalog each) are served uncached
+    if offset and (limit is None or offset % limit):
+        body = query_products(snapshot, brand, category, None, in_stock_only,
+                              with_images_only, sort, limit, offset, wanted, facets)
+        return Response(content=body, media_type="application/json")
+    
+    key = (
+        (brand or "").lower(),
+        (category or "").lower(),
+        in_stock_only,
+        with_images_only,
+        sort if sort in snapshot.sort_orders else "",  # unknown sorts behave as none
+        limit,
+        offset,
+        tuple(sorted(wanted)) if wanted else None,
+        facets
+    )
+    cached = listing_cache.get(snapshot, key)
+    if cached is None:
+        body = query_products(snapshot, brand, category, None, in_stock_only,
+                              with_images_only, sort, limit, offset, wanted, facets)
+        # gzip -9 + brotli -9 of a full listing takes 100+ ms
+        cached = listing_cache.put(snapshot, key, await run_in_threadpool(build_cached_response, body))
+    
+    return cached.to_response(request.headers.get("accept-encoding", ""))
+
+
+def query_products(snapshot, brand: Optional[str], category: Optional[str],
+                   search: Optional[str], in_stock_only: bool, with_images_only: bool,
+                   sort: Optional[str], limit: Optional[int], offset: int,
+                   wanted: Optional[set], facets: bool = False) -> bytes:
+    """Filter, sort and paginate products from a catalog snapshot (as JSON bytes)"""
+    # Brand, category, stock and image filters come from the precomputed indexes
+    skus = snapshot.filter_skus(
+        brand=brand,
+        category=category,
+        in_stock_only=in_stock_only,
+        with_images_only=with_images_only
+    )
     
-    if in_stock_only:
-        products = [p for p in products if p.get("in_stock", False)]
-    
-    # Add popularity score to each product
-    for product in products:
-        sku = product.get("sku", "")
-        if sku in rankings:
-            product["popularity_score"] = rankings[sku].get("score", 50)
-        else:
-            product["popularity_score"] = 50  # Default score
-    
-    # Apply sorting
-    if sort == "popularity":
-        # For Christmas category, interleave by keyword for variety
-        if category and category.lower() == "christmas":
-            keyword_groups = {
-                'light': [], 'house': [], 'santa': [], 'christmas': [],
-                'candle': [], 'star': [], 'angel': [], 'tree': [], 'other': []
-            }
-            
-            for p in products:
-                name = (p.get('name') or '').lower()
-                placed = False
-                for keyword in ['light', 'house', 'santa', 'christmas', 'candle', 'star', 'angel', 'tree']:
-                    if keyword in name and not placed:
-                        keyword_groups[keyword].append(p)
-                        placed = True
-                        break
-                if not placed:
-                    keyword_groups['other'].append(p)
-            
-            # Sort each group by popularity
-            for key in keyword_groups:
-                keyword_groups[key].sort(key=lambda p: -p.get('popularity_score', 50))
-            
-            # Interleave for variety
-            result = []
-            group_keys = ['light', 'house', 'santa', 'christmas', 'candle', 'star', 'angel', 'tree', 'other']
-            max_len = max(len(keyword_groups[k]) for k in group_keys) if keyword_groups else 0
-            
-            for i in range(max_len):
-                for key in group_keys:
-                    if i < len(keyword_groups[key]):
-                        result.append(keyword_groups[key][i])
-            
-            products = result
-        else:
-            products.sort(key=lambda p: -p.get("popularity_score", 50))
-    elif sort == "price-asc":
-        products.sort(key=lambda p: p.get("price", 0))
-    elif sort == "price-desc":
-        products.sort(key=lambda p: -p.get("price", 0))
-    elif sort == "name":
-        products.sort(key=lambda p: p.get("name", "").lower())
-    # Default sort (no sort param): by popularity for categories, by name otherwise
-    elif category:
-        if category.lower() == "christmas":
-            # Same interleaved variety sort as above
-            keyword_groups = {
-                'light': [], 'house': [], 'santa': [], 'christmas': [],
-                'candle': [], 'star': [], 'angel': [], 'tree': [], 'other': []
+    ranked = None
+    if search:
+        ranked = snapshot.search.search(search, within=skus)
+        skus = set(ranked)
+    
+    # Default sort (no sort param): by relevance for searches, by popularity for categories
+    if sort not in snapshot.sort_orders and category and not search:
+        sort = "popularity"
+    
+    if sort == "popularity" and snapshot.diversity.has_rule(category):
+        # Categories like Christmas interleave keyword groups for variety;
+        # the order for a given set of filters is cached per snapshot (only
+        # for brands that exist, so arbitrary brand= values can't grow it)
+        known_brand = not brand or brand.lower() in snapshot.indexes.by_brand
+        cache_key = None if search or not known_brand else (
+            (brand or "").lower(), in_stock_only, with_images_only
+        )
+        ordered = snapshot.diversity.order(category, skus, cache_key)
+    elif sort in snapshot.sort_orders:
+        ordered = snapshot.skus_sorted(sort, skus)
+    elif ranked is not None:
+        ordered = ranked
+    else:
+        ordered = snapshot.skus_in_file_order(skus)
+    
+    # Only the returned page is rendered; "products" goes first in the output
+    if limit is None and not offset:
+        page = ordered
+        result = {"count": len(ordered)}
+    else:
+        # Paginate - count is still the full match count
+        end = offset + limit if limit is not None else len(ordered)
+        
+        page = ordered[offset:end]
+        result = {
+            "count": len(ordered),
+            "offset": offset,
+            "limit": limit,
+            "next_cursor": encode_cursor(end, snapshot.version) if end < len(ordered) else None
+        }
+    
+    if facets:
+        result["facets"] = snapshot.facets.counts(
+            brand=brand,
+            category=category,
+            in_stock_only=in_stock_only,
+            with_images_only=with_images_only,
+            within=ranked
+        )
+    
+    return render_products(snapshot, page, wanted, result)
+
+
+SUGGEST_FIELDS = {"sku", "name", "brand", "price", "image_url"}
+
+
+@app.get("/api/search/suggest")
+async def search_suggest(q: str, limit: int = Query(8, ge=1, le=TOP_RESULTS)):
+    """Typeahead: top matching products (with images) for a partial query"""
+    snapshot = catalog.get()
+    skus = snapshot.search.search(q, limit=limit, within=snapshot.indexes.has_image)
+    
+    return FastJSONResponse({
+        "query": q,
+        "results": [
+            {
+                "sku": p["sku"],
+                "name": p.get("name"),
+                "brand": p.get("brand"),
+                "price": p.get("price"),
+                "image_url": p.get("image_url")
             }
-            
-            for p in products:
-                name = (p.get('name') or '').lower()
-                placed = False
-                for keyword in ['light', 'house', 'santa', 'christmas', 'candle', 'star', 'angel', 'tree']:
-                    if keyword in name and not placed:
-                        keyword_groups[keyword].append(p)
-                        placed = True
-                        break
-                if not placed:
-                    keyword_groups['other'].append(p)
-            
-            for key in keyword_groups:
-                keyword_groups[key].sort(key=lambda p: -p.get('popularity_score', 50))
-            
-            result = []
-            group_keys = ['light', 'house', 'santa', 'christmas', 'candle', 'star', 'angel', 'tree', 'other']
-            max_len = max(len(keyword_groups[k]) for k in group_keys) if keyword_groups else 0
-            
-            for i in range(max_len):
-                for key in group_keys:
-                    if i < len(keyword_groups[key]):
-                        result.append(keyword_groups[key][i])
-            
-            products = result
-        else:
-            products.sort(key=lambda p: -p.get("popularity_score", 50))
-    
-    return {"products": products, "count": len(products)}
+            for p in snapshot.products_ranked(skus, SUGGEST_FIELDS)
+        ]
+    })
+
+
+MAX_BATCH_SKUS = 200
+
+
+@app.get("/api/products:batch")
+async def get_products_batch(skus: str):
+    """Get several products by SKU in one call (comma-separated, order kept)"""
+    snapshot = catalog.get()
+    requested = [s.strip() for s in skus.split(",") if s.strip()]
+    
+    if len(requested) > MAX_BATCH_SKUS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SKUS} SKUs per batch")
+    
+    found = [sku for sku in dict.fromkeys(requested) if snapshot.has_sku(sku)]
+    missing = [sku for sku in dict.fromkeys(requested) if not snapshot.has_sku(sku)]
+    
+    body = render_products(snapshot, found, None, {"count": len(found), "missing": missing})
+    return Response(content=body, media_type="application/json")
 
 
 @app.get("/api/products/{sku}")
 async def get_product(sku: str):
     """Get single product by SKU"""
-    products = load_products()
-    rankings = load_rankings()
+    snapshot = catalog.get()
+    product = snapshot.product(sku)
     
-    for product in products:
-        if product.get("sku") == sku:
-            # Add popularity score
-            if sku in rankings:
-                product["popularity_score"] = rankings[sku].get("score", 50)
-            return product
+    if product is None:
+        raise HTTPException(status_code=404, detail="Product not found")
     
-    raise HTTPException(status_code=404, detail="Product not found")
+    # Add popularity score
+    if sku in snapshot.rankings:
+        product["popularity_score"] = snapshot.popularity(sku)
+    return FastJSONResponse(product)
 
 
 @app.get("/api/brands")
 async def get_brands():
     """Get list of available brands with counts (only products with images)"""
-    products = load_products()
-    # Only count products with images
-    products = [p for p in products if p.get("has_image", False)]
-    
-    brand_counts = {}
-    for product in products:
-        brand = product.get("brand", "Other")
-        brand_counts[brand] = brand_counts.get(brand, 0) + 1
-    
-    return {
-        "brands": [
-            {"name": brand, "count": count}
-            for brand, count in sorted(brand_counts.items())
-        ]
-    }
+    return FastJSONResponse(catalog.get().aggregates.brands)
 
 
 @app.get("/api/categories")
 async def get_categories():
     """Get list of available categories with counts (only products with images)"""
-    products = load_products()
-    # Only count products with images
-    products = [p for p in products if p.get("has_image", False)]
-    
-    category_counts = {}
-    for product in products:
-        cats = product.get("categories", [product.get("category", "Other")])
-        for category in cats:
-            category_counts[category] = category_counts.get(category, 0) + 1
-    
-    return {
-        "categories": [
-            {"name": cat, "count": count}
-            for cat, count in sorted(category_counts.items())
-        ],
-        "total_products": len(products)
-    }
+    return FastJSONResponse(catalog.get().aggregates.categories)
 
 
 @app.get("/api/stats")
 async def get_stats():
     """Get basic stats"""
-    products = load_products()
-    
-    in_stock = sum(1 for p in products if p.get("in_stock", False))
-    with_images = sum(1 for p in products if p.get("has_image", False))
-    multi_category = sum(1 for p in products if len(p.get("categories", [])) > 1)
-    
-    brands = {}
-    categories = {}
-    for p in products:
-        # Only count products with images
-        if not p.get("has_image", False):
-            continue
-        brands[p.get("brand", "Other")] = brands.get(p.get("brand", "Other"), 0) + 1
-        for cat in p.get("categories", [p.get("category", "Other")]):
-            categories[cat] = categories.get(cat, 0) + 1
-    
-    return {
-        "total_products": len(products),
-        "displayable_products": with_images,
-        "in_stock": in_stock,
-        "out_of_stock": len(products) - in_stock,
-        "with_images": with_images,
-        "without_images": len(products) - with_images,
-        "multi_category_products": multi_category,
-        "brands": brands,
-        "categories": categories
-    }
+    return FastJSONResponse(catalog.get().aggregates.stats)
 
 
 @app.get("/api/rankings/info")
 async def get_rankings_info():
     """Get info about current rankings"""
-    if not RANKINGS_FILE.exists():
+    data = catalog.get().rankings_info
+    if not data:
         return {"status": "not_generated", "message": "Run update_rankings.py to generate"}
     
-    with open(RANKINGS_FILE) as f:
-        data = json.load(f)
-    
     return {
         "status": "ok",
         "generated_at": data.get("generated_at"),
@@ -440,7 +501,7 @@ async def get_rankings_info():
 @app.get("/api/bestsellers")
 async def get_bestsellers(limit: int = 50, in_stock_only: bool = True):
     """Get best selling products based on last 3 months sales"""
-    data = load_bestsellers()
+    data = catalog.get().bestsellers
     bestsellers = data.get("bestsellers", [])
     
     # Filter by stock if requested
@@ -450,23 +511,86 @@ async def get_bestsellers(limit: int = 50, in_stock_only: bool = True):
     # Apply limit
     bestsellers = bestsellers[:limit]
     
-    return {
+    return FastJSONResponse({
         "bestsellers": bestsellers,
         "count": len(bestsellers),
         "generated_at": data.get("generated_at"),
         "date_range": data.get("date_range")
-    }
+    })
 
 
 @app.get("/health")
 async def health_check():
-    """Health check"""
-    products = load_products()
-    with_images = sum(1 for p in products if p.get("has_image", False))
+    """Liveness check - constant time, never touches the data files"""
+    snapshot = catalog.current
     return {
         "status": "healthy",
-        "products_loaded": len(products),
-        "displayable": with_images
+        "products_loaded": len(snapshot.products) if snapshot else 0,
+        "displayable": snapshot.aggregates.displayable if snapshot else 0
+    }
+
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness check - is a catalog loaded, and how old is it"""
+    snapshot = catalog.current
+    if snapshot is None:
+        return JSONResponse(status_code=503, content={"status": "loading"})
+    
+    now = time.time()
+    return {
+        "status": "ready",
+        "catalog_version": snapshot.version,
+        "products_loaded": len(snapshot.products),
+        "snapshot_age_seconds": round(now - snapshot.loaded_at, 1),
+        "data_age_seconds": round(now - snapshot.modified_at, 1)
+    }
+
+
+def require_admin(authorization: Optional[str]):
+    """Reject the request unless it carries the admin bearer token"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=503, detail="Admin API not configured")
+    # Bytes: compare_digest rejects str with non-ASCII characters (header
+    # values arrive latin-1 decoded)
+    if not hmac.compare_digest((authorization or "").encode("latin-1"),
+                               f"Bearer {ADMIN_TOKEN}".encode()):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+
+@app.post("/admin/reload")
+async def admin_reload(authorization: Optional[str] = Header(None), force: bool = False):
+    """
+    Rebuild the catalog from the data files now, e.g. straight after an
+    import, and re-index the static files. Builds off the event loop;
+    requests keep the old snapshot until the new one is swapped in.
+
+    `updated` says whose state changed: with CATALOG_SHARED=1 the loader
+    publishes for every worker, while the static file index is only ever
+    refreshed in the worker that answered.
+    """
+    require_admin(authorization)
+    
+    shared = isinstance(catalog, SharedCatalogStore)
+    previous = catalog.current
+    published = catalog.published_generation if shared else None
+    try:
+        snapshot = await run_in_threadpool(catalog.reload, force)
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    static_count = await run_in_threadpool(static_files.refresh)
+
+    if shared:
+        catalog_updated = "all workers" if catalog.published_generation != published else "none"
+    else:
+        catalog_updated = "this worker" if snapshot is not previous else "none"
+    return {
+        "status": "reloaded" if snapshot is not previous else "unchanged",
+        "catalog_version": snapshot.version,
+        "products_loaded": len(snapshot.products),
+        "static_files": static_count,
+        "worker_pid": os.getpid(),
+        "updated": {"catalog": catalog_updated, "static_files": "this worker"}
     }
 
 
@@ -590,18 +714,20 @@ async def place_order(request: CheckoutRequest):
     Place an order:
     1. Validate cart items
     2. Calculate totals
-    3. Create Sales Order in Zoho
+    3. Queue it in the order outbox (the outbox worker creates the Sales
+       Order in Zoho - see GET /api/orders/{reference})
+    
+    Placing the same payment_intent_id again returns the original order.
     """
     
     # Validate items exist and get current prices
-    products = load_products()
-    product_map = {p["sku"]: p for p in products}
+    snapshot = catalog.get()
     
     validated_items = []
     subtotal = 0
     
     for item in request.items:
-        product = product_map.get(item.sku)
+        product = snapshot.product(item.sku)
         if not product:
             raise HTTPException(status_code=400, detail=f"Product not found: {item.sku}")
         
@@ -612,7 +738,9 @@ async def place_order(request: CheckoutRequest):
             "sku": item.sku,
             "quantity": item.quantity,
             "price": current_price,
-            "name": product.get("name", item.sku)
+            "name": product.get("name", item.sku),
+            # Resolved locally, so checkout doesn't look each SKU up in Zoho
+            "item_id": snapshot.item_id(item.sku)
         })
         
         subtotal += current_price * item.quantity
@@ -623,7 +751,7 @@ async def place_order(request: CheckoutRequest):
     
     total = subtotal + shipping_charge
     
-    # Create order in Zoho
+    # Queue the order for Zoho
     customer_data = {
         "email": request.customer.email,
         "name": request.customer.name,
@@ -632,28 +760,66 @@ async def place_order(request: CheckoutRequest):
         "shipping_address": request.customer.shipping_address.dict() if request.customer.shipping_address else None
     }
     
-    result = await create_order_from_cart(
-        cart_items=validated_items,
-        customer_info=customer_data,
-        shipping_method=request.shipping_method,
-        shipping_charge=shipping_charge,
+    order = await run_in_threadpool(
+        outbox.enqueue,
+        {
+            "cart_items": validated_items,
+            "customer_info": customer_data,
+            "shipping_method": request.shipping_method,
+            "shipping_charge": shipping_charge,
+        },
+        subtotal, shipping_charge, total,
         payment_intent_id=request.payment_intent_id
     )
     
-    if not result.get("success"):
-        raise HTTPException(status_code=500, detail=result.get("error", "Failed to create order"))
-    
     return {
         "success": True,
-        "order_number": result.get("salesorder_number"),
-        "order_id": result.get("salesorder_id"),
-        "subtotal": subtotal,
-        "shipping": shipping_charge,
-        "total": total,
+        # The reference is what the customer sees; Zoho's sales order
+        # number follows once the order is submitted
+        "order_number": order["reference"],
+        "order_reference": order["reference"],
+        "status": order["status"],
+        "order_id": order["salesorder_id"],
+        "subtotal": order["subtotal"],
+        "shipping": order["shipping"],
+        "total": order["total"],
         "customer_email": request.customer.email
     }
 
 
+def order_status(order: dict) -> dict:
+    return {
+        "order_reference": order["reference"],
+        "status": order["status"],
+        "salesorder_number": order["salesorder_number"],
+        "order_id": order["salesorder_id"],
+        "subtotal": order["subtotal"],
+        "shipping": order["shipping"],
+        "total": order["total"],
+        "attempts": order["attempts"],
+        "created_at": order["created_at"],
+        "updated_at": order["updated_at"]
+    }
+
+
+@app.get("/api/orders/{reference}")
+async def get_order_status(reference: str):
+    """Where an order is: queued, submitting, submitted (to Zoho) or failed"""
+    order = await run_in_threadpool(outbox.get, reference)
+    if order is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return order_status(order)
+
+
+@app.post("/admin/orders/{reference}/retry")
+async def retry_order(reference: str, authorization: Optional[str] = Header(None)):
+    """Queue a failed order for submission again"""
+    require_admin(authorization)
+    if not await run_in_threadpool(outbox.retry, reference):
+        raise HTTPException(status_code=409, detail="Order not found or not failed")
+    return order_status(await run_in_threadpool(outbox.get, reference))
+
+
 @app.post("/api/checkout/test-order")
 async def create_test_order():
     """
@@ -662,9 +828,9 @@ async def create_test_order():
     """
     
     # Get a real product SKU
-    products = load_products()
+    snapshot = catalog.get()
     test_product = None
-    for p in products:
+    for p in snapshot.products:
         if p.get("in_stock") and p.get("price", 0) > 0:
             test_product = p
             break
@@ -677,7 +843,8 @@ async def create_test_order():
         {
             "sku": test_product["sku"],
             "quantity": 1,
-            "price": test_product["price"]
+            "price": test_product["price"],
+            "item_id": snapshot.item_id(test_product["sku"])
         }
     ]
     
@@ -699,7 +866,7 @@ async def create_test_order():
         customer_info=test_customer,
         shipping_method="standard",
         shipping_charge=4.99,
-        payment_intent_id="TEST_ORDER_" + str(int(__import__("time").time()))
+        payment_intent_id="TEST_ORDER_" + str(int(time.time()))
     )
     
     return {
@@ -0,0 +1,276 @@
+"""
+Home & Verse - Order Outbox
+============================
+Checkout writes the validated order to a local SQLite outbox and answers
+at once with an order reference; a background worker pushes queued
+orders to Zoho (customer, sales order) with retries. A slow or failing
+Zoho no longer slows checkout down or loses an order Stripe has charged.
+
+- One row per order, keyed by its reference (HV-...), written with
+  synchronous=FULL before checkout returns.
+- payment_intent_id is unique: placing the same paid order twice returns
+  the first order instead of queueing a second one.
+- Workers claim an order with a single UPDATE, so several uvicorn workers
+  can run the loop against the same file. A claim older than
+  ORDER_CLAIM_TIMEOUT (worker died mid-submit) is taken over; retries of a
+  paid order first ask Zoho for a sales order with that payment reference,
+  so a lost reply never becomes a duplicate sales order.
+- Failed submissions back off exponentially; after ORDER_MAX_ATTEMPTS the
+  order is marked failed (it stays in the outbox for a manual retry).
+
+Status: queued -> submitting -> submitted
+                            \\-> queued (retry) ... -> failed
+"""
+
+import asyncio
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from zoho_orders import create_order_from_cart, find_sales_order_by_reference
+
+# Must be on persistent storage in production (render.yaml mounts a disk
+# at /var/data) - a queued order lives only here until Zoho has it
+ORDER_OUTBOX_FILE = Path(os.getenv("ORDER_OUTBOX_FILE", "data/orders.db"))
+
+# Seconds between outbox polls (new orders also wake the worker directly)
+ORDER_OUTBOX_POLL = float(os.getenv("ORDER_OUTBOX_POLL", "5"))
+
+# A claim older than this (seconds) belongs to a dead worker
+ORDER_CLAIM_TIMEOUT = float(os.getenv("ORDER_CLAIM_TIMEOUT", "300"))
+
+ORDER_MAX_ATTEMPTS = int(os.getenv("ORDER_MAX_ATTEMPTS", "10"))
+
+# Retry backoff (seconds): base * 2^(attempt - 1), capped
+ORDER_RETRY_BASE = 30
+ORDER_RETRY_MAX = 3600
+
+QUEUED = "queued"
+SUBMITTING = "submitting"
+SUBMITTED = "submitted"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    reference TEXT PRIMARY KEY,
+    payment_intent_id TEXT UNIQUE,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,          -- create_order_from_cart arguments (JSON)
+    subtotal REAL NOT NULL,
+    shipping REAL NOT NULL,
+    total REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    claimed_at REAL,
+    last_error TEXT,
+    salesorder_id TEXT,
+    salesorder_number TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS orders_pending ON orders (status, next_attempt_at);
+"""
+
+
+def new_reference() -> str:
+    return "HV-" + secrets.token_hex(5).upper()
+
+
+def retry_delay(attempts: int) -> float:
+    return min(ORDER_RETRY_BASE * 2 ** (attempts - 1), ORDER_RETRY_MAX)
+
+
+class OrderOutbox:
+    """Durable order queue plus the worker that drains it into Zoho"""
+
+    def __init__(self, path: Path = ORDER_OUTBOX_FILE):
+        self.path = Path(path)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """The connection (opened, and the schema created, on first use)"""
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Orders are money: fsync every commit
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # ==========================================
+    # QUEUE
+    # ==========================================
+
+    def enqueue(self, payload: dict, subtotal: float, shipping: float, total: float,
+                payment_intent_id: Optional[str] = None) -> dict:
+        """
+        Record a validated order and return it. An order already queued for
+        the same payment_intent_id is returned instead of adding another.
+        """
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO orders (reference, payment_intent_id, status, payload, subtotal, "
+                "shipping, total, next_attempt_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(payment_intent_id) DO NOTHING",
+                (new_reference(), payment_intent_id, QUEUED, json.dumps(payload),
+                 subtotal, shipping, total, now, now, now)
+            )
+            row = self.conn.execute(
+                "SELECT * FROM orders WHERE payment_intent_id = ?" if payment_intent_id
+                else "SELECT * FROM orders WHERE rowid = last_insert_rowid()",
+                (payment_intent_id,) if payment_intent_id else ()
+            ).fetchone()
+        self._notify()
+        return dict(row)
+
+    def get(self, reference: str) -> Optional[dict]:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT * FROM orders WHERE reference = ?", (reference,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def claim(self) -> Optional[dict]:
+        """Take the oldest order that is due (or abandoned) for submission"""
+        now = time.time()
+        with self._lock, self.conn:
+            row = self.conn.execute(
+                "UPDATE orders SET status = ?, claimed_at = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE reference = ("
+                "  SELECT reference FROM orders"
+                "  WHERE (status = ? AND next_attempt_at <= ?)"
+                "     OR (status = ? AND claimed_at < ?)"
+                "  ORDER BY created_at LIMIT 1"
+                ") RETURNING *",
+                (SUBMITTING, now, now, QUEUED, now, SUBMITTING, now - ORDER_CLAIM_TIMEOUT)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def mark_submitted(self, reference: str, result: dict):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE orders SET status = ?, salesorder_id = ?, salesorder_number = ?, "
+                "last_error = NULL, claimed_at = NULL, updated_at = ? WHERE reference = ?",
+                (SUBMITTED, result.get("salesorder_id"), result.get("salesorder_number"),
+                 time.time(), reference)
+            )
+
+    def mark_failed(self, order: dict, error: str):
+        """Schedule a retry, or give up after ORDER_MAX_ATTEMPTS"""
+        now = time.time()
+        attempts = order["attempts"]
+        status = FAILED if attempts >= ORDER_MAX_ATTEMPTS else QUEUED
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE orders SET status = ?, last_error = ?, next_attempt_at = ?, "
+                "claimed_at = NULL, updated_at = ? WHERE reference = ?",
+                (status, error, now + retry_delay(attempts), now, order["reference"])
+            )
+        if status == FAILED:
+            print(f"Order {order['reference']} failed after {attempts} attempts: {error}")
+
+    def retry(self, reference: str) -> bool:
+        """Queue a failed order again, now"""
+        now = time.time()
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                "UPDATE orders SET status = ?, attempts = 0, next_attempt_at = ?, "
+                "updated_at = ? WHERE reference = ? AND status = ?",
+                (QUEUED, now, now, reference, FAILED)
+            )
+        if cursor.rowcount:
+            self._notify()
+        return bool(cursor.rowcount)
+
+    # ==========================================
+    # WORKER
+    # ==========================================
+
+    async def submit(self, order: dict):
+        """Push one claimed order to Zoho and record the outcome"""
+        payload = json.loads(order["payload"])
+        payment_intent_id = order["payment_intent_id"]
+
+        try:
+            result = None
+            if payment_intent_id and (order["attempts"] > 1 or order["last_error"]):
+                # An earlier attempt may have created it before failing/dying
+                result = await find_sales_order_by_reference(payment_intent_id)
+            if result is None:
+                result = await create_order_from_cart(
+                    cart_items=payload["cart_items"],
+                    customer_info=payload["customer_info"],
+                    shipping_method=payload["shipping_method"],
+                    shipping_charge=payload["shipping_charge"],
+                    payment_intent_id=payment_intent_id
+                )
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+
+        # Each commit is an fsync - keep it off the event loop
+        if result.get("success"):
+            await asyncio.to_thread(self.mark_submitted, order["reference"], result)
+        else:
+            await asyncio.to_thread(self.mark_failed, order,
+                                    result.get("error", "Failed to create order"))
+
+    def _notify(self):
+        """Wake the worker now (callable from any thread)"""
+        if self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def start_worker(self):
+        if self._worker is None:
+            self._loop = asyncio.get_running_loop()
+            self._wake = asyncio.Event()
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop_worker(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+            self._wake = None
+            self._loop = None
+
+    async def _run(self):
+        while True:
+            try:
+                while (order := await asyncio.to_thread(self.claim)) is not None:
+                    await self.submit(order)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Order outbox worker error: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), ORDER_OUTBOX_POLL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+
+# Process-wide outbox
+outbox = OrderOutbox()
@@ -0,0 +1,90 @@
+"""
+Home & Verse - Pre-compressed Static Files
+===========================================
+Writes .br/.gz sidecars next to compressible static files at build time.
+static_index.py serves a sidecar instead of the original when the client
+accepts it, so the server never compresses static files per request.
+
+A sidecar is only used while it is at least as new as its source file, so
+a file rewritten after the build (e.g. a regenerated sitemap) is served
+uncompressed rather than stale.
+
+Usage (after `npm run build`):
+    cd backend
+    python3 precompress.py            # ../dist
+    python3 precompress.py DIR ...
+"""
+
+import gzip
+import sys
+from pathlib import Path
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:  # gzip sidecars only until brotli is installed
+    brotli = None
+
+# Text formats worth compressing (images, fonts etc. are already compressed)
+COMPRESSIBLE_SUFFIXES = {
+    ".html", ".js", ".mjs", ".css", ".json", ".webmanifest", ".svg",
+    ".xml", ".txt", ".csv", ".map",
+}
+
+# Smaller files don't gain enough to be worth a second copy
+MIN_SIZE = 512
+
+# Sidecar suffix per content-encoding, in order of preference
+SIDECARS = [("br", ".br"), ("gzip", ".gz")]
+
+DEFAULT_DIRS = [Path(__file__).parent.parent / "dist"]
+
+
+def is_compressible(path) -> bool:
+    return Path(path).suffix.lower() in COMPRESSIBLE_SUFFIXES
+
+
+# ==========================================
+# BUILD
+# ==========================================
+
+def compress(data: bytes, encoding: str) -> Optional[bytes]:
+    if encoding == "br":
+        return brotli.compress(data, quality=11) if brotli else None
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def write_sidecars(root: Path) -> int:
+    """Write missing or outdated sidecars under `root`; returns how many were written"""
+    written = 0
+    for path in sorted(Path(root).rglob("*")):
+        if not path.is_file() or not is_compressible(path):
+            continue
+        st = path.stat()
+        if st.st_size < MIN_SIZE:
+            continue
+
+        data = None
+        for encoding, suffix in SIDECARS:
+            sidecar = path.with_name(path.name + suffix)
+            if sidecar.exists() and sidecar.stat().st_mtime_ns >= st.st_mtime_ns:
+                continue
+            if data is None:
+                data = path.read_bytes()
+            compressed = compress(data, encoding)
+            if compressed is None or len(compressed) >= len(data):
+                sidecar.unlink(missing_ok=True)
+                continue
+            sidecar.write_bytes(compressed)
+            written += 1
+    return written
+
+
+if __name__ == "__main__":
+    dirs = [Path(d) for d in sys.argv[1:]] or DEFAULT_DIRS
+    for directory in dirs:
+        if not directory.exists():
+            print(f"Skipping {directory} (not found)")
+            continue
+        count = write_sidecars(directory)
+        print(f"{directory}: {count} sidecars written")
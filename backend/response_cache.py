@@ -0,0 +1,144 @@
+"""
+Home & Verse - Response Cache
+==============================
+Keeps serialized JSON responses for hot catalog queries, together with
+their gzip and brotli encodings, keyed on the normalized query and the
+catalog snapshot version.
+
+Entries for an old snapshot are dropped as soon as a response for a newer
+one is stored, so a reload of products or rankings invalidates everything;
+responses still being built from an older snapshot are not stored.
+
+The cache is bounded by bytes (body plus both encodings), not entries:
+one full listing is several MB.
+"""
+
+import gzip
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi.responses import Response
+
+from fast_json import dump_json
+
+try:
+    import brotli
+except ImportError:  # gzip-only until brotli is installed
+    brotli = None
+
+# Max bytes (bodies plus encodings) kept per catalog version
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# Entries are compressed once per catalog version, so favour size over speed
+GZIP_LEVEL = int(os.getenv("RESPONSE_CACHE_GZIP_LEVEL", "9"))
+BROTLI_QUALITY = int(os.getenv("RESPONSE_CACHE_BROTLI_QUALITY", "9"))
+
+
+def accepted_encodings(accept_encoding: str) -> set:
+    """Encodings the client accepts (ignores q=0 entries)"""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        if name:
+            accepted.add(name)
+    return accepted
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """One serialized response in every encoding we serve"""
+    body: bytes
+    gzip: bytes
+    br: Optional[bytes]
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + len(self.gzip) + len(self.br or b"")
+
+    def to_response(self, accept_encoding: str = "") -> Response:
+        """Pick the smallest encoding the client accepts"""
+        accepted = accepted_encodings(accept_encoding)
+        headers = {"Vary": "Accept-Encoding"}
+
+        if self.br is not None and "br" in accepted:
+            headers["Content-Encoding"] = "br"
+            content = self.br
+        elif "gzip" in accepted:
+            headers["Content-Encoding"] = "gzip"
+            content = self.gzip
+        else:
+            content = self.body
+
+        return Response(content=content, media_type="application/json", headers=headers)
+
+
+def build_cached_response(content) -> CachedResponse:
+    """Serialize (unless already JSON bytes) and compress a response payload"""
+    body = content if isinstance(content, bytes) else dump_json(content)
+    return CachedResponse(
+        body=body,
+        gzip=gzip.compress(body, compresslevel=GZIP_LEVEL),
+        br=brotli.compress(body, quality=BROTLI_QUALITY) if brotli else None,
+    )
+
+
+class ResponseCache:
+    """Byte-bounded LRU of CachedResponse, scoped to the newest catalog snapshot"""
+
+    def __init__(self, max_bytes: int = RESPONSE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._version = None
+        self._loaded_at = 0.0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, snapshot, key: tuple) -> Optional[CachedResponse]:
+        with self._lock:
+            if snapshot.version != self._version:
+                return None
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, snapshot, key: tuple, entry: CachedResponse) -> CachedResponse:
+        """Store an entry (returned either way) for the snapshot it was built from"""
+        with self._lock:
+            if snapshot.version != self._version:
+                if snapshot.loaded_at < self._loaded_at:
+                    # Built from a snapshot older than the cached one - don't
+                    # let a slow request wipe the fresh entries
+                    return entry
+                # New catalog snapshot - everything cached so far is stale
+                self._entries.clear()
+                self.size = 0
+                self._version = snapshot.version
+                self._loaded_at = snapshot.loaded_at
+            if entry.size > self.max_bytes:
+                return entry
+
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous.size
+            self._entries[key] = entry
+            self.size += entry.size
+            while self.size > self.max_bytes:
+                _key, evicted = self._entries.popitem(last=False)
+                self.size -= evicted.size
+            return entry
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+            self._version = None
+            self._loaded_at = 0.0
@@ -0,0 +1,185 @@
+"""
+Home & Verse - Product Search Index
+====================================
+Tokenized inverted index over name, brand, SKU, EAN and description.
+Built once per catalog snapshot and kept in memory.
+
+Every query word is matched as a prefix ("cand" finds "candle"), all words
+must match, and results are ranked by field weight x rarity of the word.
+Accents are folded so "rader" finds "Räder".
+"""
+
+import heapq
+import math
+import re
+import unicodedata
+from bisect import bisect_left
+from functools import lru_cache
+
+# How much a hit in each field counts towards relevance
+FIELD_WEIGHTS = {
+    "sku": 10.0,
+    "ean": 10.0,
+    "name": 5.0,
+    "brand": 3.0,
+    "description": 1.0,
+}
+
+# Prefix hits ("cand" -> "candle") score lower than whole-word hits
+PREFIX_FACTOR = 0.6
+
+# Best matches kept per typeahead query (limits above this rank everything)
+TOP_RESULTS = 64
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+class _FoldTable(dict):
+    """str.translate table that strips accents, filled in as chars are seen"""
+
+    def __missing__(self, code: int) -> str:
+        decomposed = unicodedata.normalize("NFKD", chr(code))
+        folded = "".join(c for c in decomposed if not unicodedata.combining(c))
+        self[code] = folded
+        return folded
+
+
+_FOLD_TABLE = _FoldTable()
+
+
+def fold(text: str) -> str:
+    """Lowercase and strip accents"""
+    text = text.lower()
+    if text.isascii():
+        return text
+    return text.translate(_FOLD_TABLE)
+
+
+def tokenize(text: str) -> list[str]:
+    """Split text into folded word tokens"""
+    if not text:
+        return []
+    return _TOKEN_RE.findall(fold(text))
+
+
+class SearchIndex:
+    """Inverted index: token -> {field weight: catalog positions}"""
+
+    def __init__(self, products):
+        self.skus = [product.get("sku", "") for product in products]
+        # A repeated SKU is the product at its last position
+        position = {sku: i for i, sku in enumerate(self.skus)}
+
+        postings = {}
+        for product in products:
+            i = position[product.get("sku", "")]
+            for field, weight in FIELD_WEIGHTS.items():
+                for token in set(tokenize(product.get(field) or "")):
+                    token_postings = postings.setdefault(token, {})
+                    # A token counts once per product; keep the best field
+                    if token_postings.get(i, 0) < weight:
+                        token_postings[i] = weight
+
+        # Grouped by weight, so prefix matching is set unions, not a loop per product
+        self.postings = {}
+        for token, token_postings in postings.items():
+            by_weight = {}
+            for i, weight in token_postings.items():
+                by_weight.setdefault(weight, []).append(i)
+            self.postings[token] = by_weight
+
+        self.vocabulary = sorted(postings)
+        self.size = len(position)
+        self._term_scores = lru_cache(maxsize=2048)(self._match_term)
+        self._ranked = lru_cache(maxsize=1024)(self._rank)
+        self._top = lru_cache(maxsize=1024)(self._select_top)
+
+        # Warm the one-letter prefixes - the most expensive typeahead queries.
+        # Their per-term score dicts are large, so only keep the top matches.
+        for letter in {token[0] for token in self.vocabulary}:
+            self._top((letter,))
+        self._term_scores.cache_clear()
+
+    def _match_term(self, term: str) -> dict:
+        """
+        Score per catalog position for one query word (best exact or prefix
+        hit), in catalog order.
+        """
+        vocabulary = self.vocabulary
+        lo = bisect_left(vocabulary, term)
+        hi = bisect_left(vocabulary, term + "\uffff", lo)
+
+        # Positions per score: exact hits at full weight, prefix hits reduced
+        levels = {}
+        for token in vocabulary[lo:hi]:
+            factor = 1.0 if token == term else PREFIX_FACTOR
+            for weight, positions in self.postings[token].items():
+                levels.setdefault(weight * factor, set()).update(positions)
+
+        # Ascending, so each product ends up with its best hit
+        best = {}
+        for score in sorted(levels):
+            best.update(dict.fromkeys(levels[score], score))
+        if not best:
+            return {}
+
+        # Rarer query words count for more
+        idf = math.log(1 + self.size / len(best))
+        return {i: best[i] * idf for i in sorted(best)}
+
+    def _scores(self, terms: tuple) -> dict:
+        """
+        Summed score per catalog position matching every term, in catalog
+        order (shared with the term cache - do not modify)
+        """
+        # Fewest matches first keeps the running intersection small
+        term_scores = sorted((self._term_scores(t) for t in terms), key=len)
+        result = term_scores[0]
+        for other in term_scores[1:]:
+            result = {i: s + other[i] for i, s in result.items() if i in other}
+            if not result:
+                break
+        return result
+
+    # Both rely on catalog order in `result`: equal scores stay in that order
+
+    def _rank(self, terms: tuple) -> tuple:
+        """SKUs matching every term, best first (ties in catalog order)"""
+        result = self._scores(terms)
+        skus = self.skus
+        return tuple(skus[i] for i in sorted(result, key=result.__getitem__, reverse=True))
+
+    def _select_top(self, terms: tuple) -> tuple:
+        """The TOP_RESULTS best SKUs matching every term, without ranking the rest"""
+        result = self._scores(terms)
+        skus = self.skus
+        return tuple(skus[i] for i in heapq.nlargest(TOP_RESULTS, result, key=result.__getitem__))
+
+    def search(self, query: str, limit: int = None, within=None) -> list[str]:
+        """
+        SKUs matching the query, most relevant first.
+        `within` optionally restricts results to a set of SKUs.
+        """
+        terms = tuple(sorted(set(tokenize(query))))
+        if not terms:
+            return []
+
+        if limit is None:
+            ranked = self._ranked(terms)
+            return list(ranked) if within is None else [sku for sku in ranked if sku in within]
+
+        if limit < 1:
+            return []
+
+        # Typeahead: only the best few matches are ever looked at
+        if limit <= TOP_RESULTS:
+            top = self._top(terms)
+            results = [sku for sku in top if within is None or sku in within][:limit]
+            if len(results) == limit or len(top) < TOP_RESULTS:
+                return results
+
+        # A long limit, or `within` dropped too many of the top ones
+        result = self._scores(terms)
+        skus = self.skus
+        candidates = result if within is None else [i for i in result if skus[i] in within]
+        return [skus[i] for i in heapq.nlargest(limit, candidates, key=result.__getitem__)]
@@ -0,0 +1,380 @@
+"""
+Home & Verse - Shared Catalog
+==============================
+Multi-worker mode for the catalog store (CATALOG_SHARED=1), so several
+uvicorn workers on one host serve the same catalog version from one copy
+of the data.
+
+- One worker (whichever holds the loader lock) watches the data files and
+  publishes every catalog version as an immutable generation file: the
+  binary product snapshot with stock, rankings and bestsellers attached.
+- A shared control file holds the current generation number. Publishing
+  writes the generation file first, then bumps the counter with a single
+  aligned 8-byte store.
+- Every worker maps the generation read-only and switches to a new one as
+  soon as the counter moves, so all workers answer from the same version
+  (same ETags, same results) instead of each noticing file changes on its
+  own schedule.
+- A reload asked of any other worker (POST /admin/reload) is recorded in
+  the control file; the loader publishes for it and that worker waits for
+  the result.
+
+Product records are shared through the page cache. The lookup indexes are
+Python objects, so each worker still builds its own from the mapped
+columns - no JSON is parsed to do so.
+
+If the loader worker exits, its lock is released and the next worker to
+check takes over. With the background watcher running, publishing and
+switching both happen off the request path; the watcher reads the shared
+counter every SHARED_SWITCH_INTERVAL seconds, so workers switch within
+that window of each other.
+"""
+
+import fcntl
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+from catalog import (
+    CATALOG_CHECK_INTERVAL,
+    CatalogSnapshot,
+    CatalogStore,
+    assemble_snapshot,
+    load_products,
+    signature_version,
+)
+from catalog_snapshot import MappedCatalog, write_catalog_snapshot
+
+
+def default_shared_dir() -> Path:
+    """tmpfs when available, so generations never touch the disk"""
+    if Path("/dev/shm").is_dir():
+        return Path("/dev/shm/home-and-verse")
+    return Path("data/shared")
+
+
+SHARED_DIR = Path(os.getenv("CATALOG_SHARED_DIR", "") or default_shared_dir())
+
+# How often (seconds) the watcher reads the shared generation counter
+SHARED_SWITCH_INTERVAL = float(os.getenv("CATALOG_SHARED_SWITCH_INTERVAL", "0.1"))
+
+# How long a worker waits for the loader's first generation at startup,
+# or for the loader to answer its reload request
+SHARED_ATTACH_TIMEOUT = float(os.getenv("CATALOG_SHARED_ATTACH_TIMEOUT", "120"))
+
+CONTROL_MAGIC = b"HVSHARE\0"
+# magic, generation, reload requests (last asked, last forced, last handled)
+CONTROL = struct.Struct("<8sQQQQ")
+
+# Generations kept on disk besides the current one (for workers mid-switch)
+KEEP_GENERATIONS = 1
+
+
+def generation_path(shared_dir: Path, generation: int) -> Path:
+    return shared_dir / f"catalog-{generation}.bin"
+
+
+def read_attachment(mapped: MappedCatalog, name: str, default):
+    """Decode a JSON attachment, or `default` if the source file was missing"""
+    data = mapped.attachment(name)
+    return default if data is None else json.loads(data)
+
+
+class SharedControl:
+    """The shared generation counter and reload requests (a small mapped file)"""
+
+    def __init__(self, path: Path):
+        # Kept open: requests are numbered under its flock
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._lock = threading.Lock()
+        with self._locked():
+            size = os.fstat(self._fd).st_size
+            if size < CONTROL.size:
+                # New fields of a file from an older layout start at zero
+                os.ftruncate(self._fd, CONTROL.size)
+                if size < len(CONTROL_MAGIC):
+                    os.pwrite(self._fd, CONTROL_MAGIC, 0)
+        self._mmap = mmap.mmap(self._fd, CONTROL.size)
+
+        if self._mmap[:8] != CONTROL_MAGIC:
+            raise ValueError(f"Not a catalog control file: {path}")
+        self._fields = memoryview(self._mmap)[8:CONTROL.size].cast("Q")
+
+    @contextmanager
+    def _locked(self):
+        # flock excludes other processes, the lock other threads of this one
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    @property
+    def generation(self) -> int:
+        return self._fields[0]
+
+    @generation.setter
+    def generation(self, value: int):
+        self._fields[0] = value
+
+    def request_reload(self, force: bool) -> int:
+        """Ask the loader to publish; returns the request number to wait for"""
+        with self._locked():
+            request = self._fields[1] + 1
+            self._fields[1] = request
+            if force:
+                self._fields[2] = request
+        return request
+
+    def pending_reload(self) -> tuple:
+        """(last request number, force) if a request is unanswered, else (0, False)"""
+        requested, forced, handled = self._fields[1:4]
+        if requested <= handled:
+            return 0, False
+        return requested, forced > handled
+
+    @property
+    def reload_handled(self) -> int:
+        return self._fields[3]
+
+    @reload_handled.setter
+    def reload_handled(self, value: int):
+        self._fields[3] = value
+
+
+class SharedCatalogStore(CatalogStore):
+    """CatalogStore whose snapshots are published once per host and shared"""
+
+    def __init__(self, products_file: Path, stock_file: Path,
+                 rankings_file: Path, bestsellers_file: Path,
+                 shared_dir: Path = SHARED_DIR):
+        super().__init__(products_file, stock_file, rankings_file, bestsellers_file)
+        self.shared_dir = Path(shared_dir)
+        self.shared_dir.mkdir(parents=True, exist_ok=True)
+        self._control = SharedControl(self.shared_dir / "control")
+        self._generation = 0
+        self._loader_fd: Optional[int] = None
+        self._published: Optional[tuple] = None  # (generation, version)
+        self._publish_lock = threading.Lock()
+
+    @property
+    def published_generation(self) -> int:
+        """Latest generation published on this host (not necessarily attached yet)"""
+        return self._control.generation
+
+    def _try_become_loader(self) -> bool:
+        """Take the host-wide loader lock if nobody holds it"""
+        if self._loader_fd is not None:
+            return True
+        fd = os.open(self.shared_dir / "loader.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._loader_fd = fd
+        return True
+
+    # ==========================================
+    # LOADER
+    # ==========================================
+
+    def _published_version(self, generation: int) -> Optional[str]:
+        """Version of the data behind a published generation"""
+        if self._published and self._published[0] == generation:
+            return self._published[1]
+        try:
+            mapped = MappedCatalog(generation_path(self.shared_dir, generation))
+        except (OSError, ValueError):
+            return None
+        version = read_attachment(mapped, "meta", {}).get("version")
+        self._published = (generation, version)
+        return version
+
+    def publish(self, force: bool = False) -> int:
+        """
+        Publish the data files as a new generation if they changed since the
+        current one (always, with force). Loader only. Returns the current
+        generation.
+        """
+        with self._publish_lock:
+            current = self._control.generation
+            signature = self._current_signature()
+            version, modified_at = signature_version(signature)
+            if not force and current and self._published_version(current) == version:
+                return current
+
+            attachments = {
+                "meta": json.dumps({"version": version, "modified_at": modified_at}).encode()
+            }
+            for name in ("stock", "rankings", "bestsellers"):
+                path = self.files[name]
+                if path.exists():
+                    attachments[name] = path.read_bytes()
+
+            generation = current + 1
+            write_catalog_snapshot(
+                load_products(self.files["products"]),
+                generation_path(self.shared_dir, generation),
+                self.files["products"],
+                attachments,
+            )
+            self._control.generation = generation
+            self._published = (generation, version)
+            self._remove_old_generations(generation)
+            return generation
+
+    def _serve_reload_request(self):
+        """Publish for a reload another worker asked for (loader only)"""
+        requested, force = self._control.pending_reload()
+        if requested:
+            try:
+                self.publish(force)
+            finally:
+                # Answered either way - a failed publish leaves the generation as it was
+                self._control.reload_handled = requested
+
+    def _remove_old_generations(self, current: int):
+        # Workers still mapping an old file keep their pages until they switch
+        for path in self.shared_dir.glob("catalog-*.bin"):
+            try:
+                generation = int(path.stem.split("-", 1)[1])
+            except ValueError:
+                continue
+            if generation < current - KEEP_GENERATIONS:
+                path.unlink(missing_ok=True)
+
+    # ==========================================
+    # WORKERS
+    # ==========================================
+
+    def _attach(self, generation: int) -> CatalogSnapshot:
+        """Map a published generation and build this worker's indexes over it"""
+        with self._lock:
+            if generation == self._generation and self._snapshot is not None:
+                return self._snapshot
+
+            mapped = MappedCatalog(generation_path(self.shared_dir, generation))
+            meta = read_attachment(mapped, "meta", {})
+            snapshot = assemble_snapshot(
+                mapped, tuple(mapped.index_rows()),
+                stock=read_attachment(mapped, "stock", {}).get("stock", {}),
+                rankings_data=read_attachment(mapped, "rankings", {}),
+                bestsellers=read_attachment(
+                    mapped, "bestsellers", {"bestsellers": [], "generated_at": None}),
+                version=meta.get("version", str(generation)),
+                modified_at=meta.get("modified_at", 0.0),
+            )
+            # Single reference assignment - readers see old or new, never partial
+            self._snapshot = snapshot
+            self._generation = generation
+            self._checked_at = time.monotonic()
+            return snapshot
+
+    def _attach_current(self) -> Optional[CatalogSnapshot]:
+        """
+        Attach the generation the counter names (None if nothing is published
+        yet). One superseded and removed before we mapped it is skipped for
+        the newer one.
+        """
+        while True:
+            generation = self._control.generation
+            if not generation:
+                return None
+            try:
+                return self._attach(generation)
+            except (OSError, ValueError):
+                if self._control.generation == generation:
+                    raise
+
+    def load(self) -> CatalogSnapshot:
+        """Publish (if we are the loader) or wait for the loader, then attach"""
+        deadline = time.monotonic() + SHARED_ATTACH_TIMEOUT
+        while True:
+            if self._try_become_loader():
+                self.publish()
+            snapshot = self._attach_current()
+            if snapshot is not None:
+                return snapshot
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"No catalog published in {self.shared_dir}")
+            time.sleep(0.05)
+
+    def reload(self, force: bool = False) -> CatalogSnapshot:
+        """
+        Publish changed data files (always, with force), then switch to the
+        latest generation. Other workers ask the loader to publish and wait
+        for it.
+        """
+        if self._try_become_loader():
+            self.publish(force)
+        else:
+            self._request_reload(force)
+        snapshot = self._attach_current()
+        if snapshot is None:
+            return self.load()
+        return snapshot
+
+    def _request_reload(self, force: bool):
+        request = self._control.request_reload(force)
+        deadline = time.monotonic() + SHARED_ATTACH_TIMEOUT
+        while self._control.reload_handled < request:
+            if self._try_become_loader():
+                # The loader exited - answer the request ourselves
+                self._serve_reload_request()
+                return
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Catalog loader did not answer a reload in {self.shared_dir}")
+            time.sleep(0.05)
+
+    def start_watching(self, interval: float = CATALOG_CHECK_INTERVAL):
+        super().start_watching(min(interval, SHARED_SWITCH_INTERVAL))
+
+    def _watch(self, interval: float):
+        last_publish_check = time.monotonic()
+        while not self._stop_watching.wait(interval):
+            try:
+                now = time.monotonic()
+                if now - last_publish_check >= CATALOG_CHECK_INTERVAL:
+                    last_publish_check = now
+                    if self._try_become_loader():
+                        self.publish()
+                if self._control.pending_reload()[0] and self._try_become_loader():
+                    self._serve_reload_request()
+                generation = self._control.generation
+                if generation != self._generation:
+                    self._attach(generation)
+            except Exception as e:
+                print(f"Catalog reload failed: {e}")
+
+    def get(self) -> CatalogSnapshot:
+        """Current snapshot, switching first if a newer generation was published"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.load()
+        if self._watcher is not None:
+            return snapshot  # the watcher publishes and switches in the background
+
+        now = time.monotonic()
+        if now - self._checked_at >= CATALOG_CHECK_INTERVAL:
+            self._checked_at = now
+            if self._try_become_loader():
+                self.publish()
+        if self._control.pending_reload()[0] and self._try_become_loader():
+            self._serve_reload_request()
+
+        generation = self._control.generation
+        if generation == self._generation:
+            return snapshot
+        try:
+            return self._attach(generation)
+        except (OSError, ValueError):
+            # Superseded before we mapped it - pick up the next one later
+            return snapshot
@@ -0,0 +1,182 @@
+"""
+Home & Verse - Static File Index
+=================================
+Serves the built frontend (dist/) and public/ from a table built once at
+startup, instead of a route per file that probes the disk on every request.
+
+Each URL path maps to its file, size, mtime, ETag and content type, plus
+any pre-compressed .br/.gz sidecars (see precompress.py). Lookups and
+304 answers never touch the disk. 200s are FileResponses, which handle
+Range requests and use the server's pathsend extension when available.
+
+dist/ wins over public/ for the same path. The table is rebuilt by
+`refresh()` - on startup and on POST /admin/reload (i.e. on deploy).
+"""
+
+import hashlib
+import mimetypes
+import os
+import threading
+from dataclasses import dataclass, field
+from email.utils import formatdate
+from pathlib import Path
+from typing import Optional
+
+from fastapi.responses import FileResponse, JSONResponse, Response
+from starlette.datastructures import Headers
+from starlette.routing import BaseRoute, Match, NoMatchFound
+
+from precompress import SIDECARS, is_compressible
+from response_cache import accepted_encodings
+
+# Content types that differ from Python's mimetypes defaults
+MEDIA_TYPE_OVERRIDES = {
+    "manifest.json": "application/manifest+json",
+    ".webmanifest": "application/manifest+json",
+    ".js": "application/javascript",
+    ".xml": "application/xml",
+}
+
+SIDECAR_SUFFIXES = tuple(suffix for _encoding, suffix in SIDECARS)
+
+
+def media_type_for(path: Path) -> str:
+    override = MEDIA_TYPE_OVERRIDES.get(path.name) or MEDIA_TYPE_OVERRIDES.get(path.suffix.lower())
+    return override or mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+
+
+@dataclass(frozen=True)
+class StaticVariant:
+    """One file on disk (the original or a sidecar) and its validators"""
+    path: str
+    size: int
+    mtime: float
+    etag: str
+    last_modified: str
+
+    @classmethod
+    def from_path(cls, path: Path) -> "StaticVariant":
+        st = os.stat(path)
+        # Same ETag as FileResponse computes, so 304s and 200s agree
+        etag_base = f"{st.st_mtime}-{st.st_size}"
+        etag = f'"{hashlib.md5(etag_base.encode(), usedforsecurity=False).hexdigest()}"'
+        return cls(str(path), st.st_size, st.st_mtime, etag,
+                   formatdate(st.st_mtime, usegmt=True))
+
+
+@dataclass(frozen=True)
+class StaticEntry:
+    media_type: str
+    identity: StaticVariant
+    encoded: dict = field(default_factory=dict)  # content-encoding -> StaticVariant
+
+    def variant(self, accept_encoding: str) -> tuple:
+        """(encoding or None, variant) - the best one the client accepts"""
+        if self.encoded:
+            accepted = accepted_encodings(accept_encoding)
+            for encoding, _suffix in SIDECARS:
+                if encoding in accepted and encoding in self.encoded:
+                    return encoding, self.encoded[encoding]
+        return None, self.identity
+
+
+def not_modified(request_headers: Headers, variant: StaticVariant) -> bool:
+    """Conditional GET check against the indexed validators"""
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or variant.etag in tags
+    return request_headers.get("if-modified-since") == variant.last_modified
+
+
+class StaticIndex:
+    """URL path -> StaticEntry for every file under the given roots"""
+
+    def __init__(self, *roots: Path):
+        self.roots = [Path(root) for root in roots]
+        self._table: dict = {}
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def __contains__(self, path: str) -> bool:
+        return path in self._table
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def refresh(self) -> int:
+        """Re-scan the roots and swap in a new table; returns its size"""
+        with self._lock:
+            table = {}
+            for root in reversed(self.roots):  # earlier roots overwrite later ones
+                if not root.is_dir():
+                    continue
+                for path in root.rglob("*"):
+                    if not path.is_file() or path.name.startswith(".") \
+                            or path.name.endswith(SIDECAR_SUFFIXES):
+                        continue
+                    table["/" + path.relative_to(root).as_posix()] = self._entry(path)
+            self._table = table
+            return len(table)
+
+    @staticmethod
+    def _entry(path: Path) -> StaticEntry:
+        identity = StaticVariant.from_path(path)
+        encoded = {}
+        if is_compressible(path):
+            for encoding, suffix in SIDECARS:
+                sidecar = path.with_name(path.name + suffix)
+                # Ignore sidecars older than the file they were built from
+                if sidecar.is_file() and sidecar.stat().st_mtime >= identity.mtime:
+                    encoded[encoding] = StaticVariant.from_path(sidecar)
+        return StaticEntry(media_type_for(path), identity, encoded)
+
+    def lookup(self, path: str) -> Optional[StaticEntry]:
+        return self._table.get(path)
+
+    def response(self, request_headers: Headers, entry: StaticEntry) -> Response:
+        """304 from the table, or the best variant as a FileResponse"""
+        encoding, variant = entry.variant(request_headers.get("accept-encoding", ""))
+        headers = {}
+        if entry.encoded or is_compressible(variant.path):
+            headers["Vary"] = "Accept-Encoding"
+        if encoding:
+            headers["Content-Encoding"] = encoding
+
+        if not_modified(request_headers, variant):
+            headers.update({"ETag": variant.etag, "Last-Modified": variant.last_modified})
+            return Response(status_code=304, headers=headers)
+        # No stat_result: FileResponse stats at send time, so a file changed
+        # since the last refresh is still served with the right length
+        return FileResponse(variant.path, media_type=entry.media_type, headers=headers)
+
+    def route(self) -> "StaticRoute":
+        return StaticRoute(self)
+
+
+class StaticRoute(BaseRoute):
+    """
+    Router entry that matches only indexed paths, so unknown URLs still
+    fall through to FastAPI's 404 / trailing-slash redirect handling.
+    """
+
+    def __init__(self, index: StaticIndex):
+        self.index = index
+
+    def matches(self, scope) -> tuple:
+        if scope["type"] != "http" or scope["path"] not in self.index:
+            return Match.NONE, {}
+        if scope["method"] not in ("GET", "HEAD"):
+            return Match.PARTIAL, {}
+        return Match.FULL, {}
+
+    def url_path_for(self, name: str, /, **path_params):
+        raise NoMatchFound(name, path_params)
+
+    async def handle(self, scope, receive, send):
+        if scope["method"] not in ("GET", "HEAD"):
+            response = JSONResponse({"detail": "Method Not Allowed"}, status_code=405,
+                                    headers={"Allow": "GET, HEAD"})
+        else:
+            response = self.index.response(Headers(scope=scope), self.index.lookup(scope["path"]))
+        await response(scope, receive, send)
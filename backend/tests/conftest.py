@@ -0,0 +1,10 @@
+import os
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# The backend modules are flat and resolve data/ relative to backend/,
+# as they do under uvicorn (render.yaml: cd backend && uvicorn main:app)
+sys.path.insert(0, str(BACKEND_DIR))
+os.chdir(BACKEND_DIR)
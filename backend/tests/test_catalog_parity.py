@@ -0,0 +1,148 @@
+"""
+/api/products output must not depend on how the catalog holds its
+products: plain dicts, CompactProducts (compact.py), the mmap'd
+catalog.bin (catalog_snapshot.py) and CATALOG_SHARED=1 generations
+(shared_catalog.py) all have to give byte-identical responses.
+"""
+
+from typing import Optional
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from catalog import (
+    assemble_snapshot,
+    build_snapshot,
+    load_bestsellers,
+    load_products,
+    load_rankings_file,
+    load_stock,
+)
+from catalog_snapshot import MappedCatalog, write_catalog_snapshot
+from compact import CompactProducts
+from response_cache import ResponseCache
+from shared_catalog import SharedCatalogStore
+
+FILES = {
+    "products": main.PRODUCTS_FILE,
+    "stock": main.STOCK_FILE,
+    "rankings": main.RANKINGS_FILE,
+    "bestsellers": main.BESTSELLERS_FILE,
+}
+
+
+class PlainProducts(list):
+    """Products as the parsed dicts - the reference the stores must match"""
+
+    def materialize(self, i: int, fields: Optional[set] = None) -> dict:
+        product = dict(self[i])
+        if fields is None:
+            return product
+        return {k: v for k, v in product.items() if k in fields}
+
+
+class FixedCatalog:
+    """Stands in for main.catalog, always serving one snapshot"""
+
+    def __init__(self, snapshot):
+        self.current = snapshot
+
+    def get(self):
+        return self.current
+
+
+@pytest.fixture(scope="module")
+def backends(tmp_path_factory):
+    """backend name -> object serving as main.catalog, all on one version"""
+    if not FILES["products"].exists():
+        pytest.skip("needs data/products.json")
+    tmp = tmp_path_factory.mktemp("catalog")
+
+    shared = SharedCatalogStore(*FILES.values(), shared_dir=tmp / "shared")
+    version = shared.load().version  # cursors carry the version
+
+    products = load_products(FILES["products"])
+    plain = assemble_snapshot(
+        PlainProducts(products), tuple(products),
+        stock=load_stock(FILES["stock"]),
+        rankings_data=load_rankings_file(FILES["rankings"]),
+        bestsellers=load_bestsellers(FILES["bestsellers"]),
+        version=version,
+    )
+
+    compact = build_snapshot(FILES, version)
+    assert isinstance(compact.products, CompactProducts)
+
+    snapshot_file = tmp / "catalog.bin"
+    write_catalog_snapshot(products, snapshot_file, FILES["products"])
+    mapped = build_snapshot({**FILES, "snapshot": snapshot_file}, version)
+    assert isinstance(mapped.products, MappedCatalog)
+
+    return {
+        "dicts": FixedCatalog(plain),
+        "compact": FixedCatalog(compact),
+        "mmap": FixedCatalog(mapped),
+        "shared": shared,
+    }
+
+
+def sample_queries(snapshot) -> list[str]:
+    by_brand = snapshot.indexes.by_brand
+    by_category = snapshot.indexes.by_category
+    brand = max(by_brand, key=lambda b: len(by_brand[b]))
+    category = max(by_category, key=lambda c: len(by_category[c]))
+    sku = snapshot.sort_orders["name"].skus[0]
+    skus = ",".join(snapshot.sort_orders["popularity"].skus[:5] + ("missing-sku",))
+
+    queries = [
+        "/api/products",
+        "/api/products?with_images_only=false&in_stock_only=true&limit=30",
+        f"/api/products?brand={brand}&limit=24&facets=true",
+        f"/api/products?category={category}&sort=price-desc&limit=24",
+        f"/api/products?brand={brand}&sort=popularity&limit=12&offset=12",
+        "/api/products?search=candle&limit=20",
+        "/api/products?search=candle&sort=price-asc&fields=sku,name,price",
+        "/api/products?fields=listing&limit=48",
+        "/api/products?fields=sku,brand,stock,image_url&sort=name&limit=48",
+        f"/api/products/{sku}",
+        f"/api/products:batch?skus={skus}",
+        "/api/brands",
+        "/api/categories",
+    ]
+    for sort in ("popularity", "price-asc", "price-desc", "name"):
+        queries.append(f"/api/products?sort={sort}&limit=24")
+    # Brand-diversified popularity ordering
+    queries += [f"/api/products?category={c}&sort=popularity&limit=24"
+                for c in by_category if snapshot.diversity.has_rule(c)][:2]
+    return queries
+
+
+def fetch(catalog, monkeypatch, queries: list[str]) -> dict:
+    """Responses for each query, following next_cursor for a few pages"""
+    monkeypatch.setattr(main, "catalog", catalog)
+    monkeypatch.setattr(main, "listing_cache", ResponseCache())
+    client = TestClient(main.app)
+
+    responses = {}
+    for query in queries:
+        response = client.get(query)
+        assert response.status_code == 200, (query, response.text)
+        responses[query] = response.content
+
+    query = "/api/products?sort=price-asc&limit=50"
+    for page in range(3):
+        response = client.get(query)
+        responses[f"cursor page {page}"] = response.content
+        query = f"/api/products?sort=price-asc&limit=50&cursor={response.json()['next_cursor']}"
+    return responses
+
+
+def test_products_api_is_identical_for_every_backend(backends, monkeypatch):
+    queries = sample_queries(backends["dicts"].get())
+    expected = fetch(backends["dicts"], monkeypatch, queries)
+
+    for name in ("compact", "mmap", "shared"):
+        responses = fetch(backends[name], monkeypatch, queries)
+        for query, body in expected.items():
+            assert responses[query] == body, f"{name} differs for {query}"
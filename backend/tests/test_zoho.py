@@ -0,0 +1,185 @@
+"""
+ZohoClient and the order outbox against fake_zoho.py, mounted in-process
+through httpx.ASGITransport (no server, no network).
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+import fake_zoho
+import order_outbox
+import zoho_orders
+from customer_cache import CustomerCache
+from order_outbox import SUBMITTED, OrderOutbox
+from zoho_client import ZohoClient
+
+
+def fake_client(**kwargs) -> ZohoClient:
+    return ZohoClient(
+        "client-id", "client-secret", "refresh-token", "1",
+        api_url="http://zoho.test/inventory/v1",
+        accounts_url="http://zoho.test",
+        transport=httpx.ASGITransport(app=fake_zoho.app),
+        **kwargs
+    )
+
+
+@pytest.fixture(autouse=True)
+def fake():
+    fake_zoho.reset_state()
+    return fake_zoho.state
+
+
+# ==========================================
+# ZOHO CLIENT
+# ==========================================
+
+def test_concurrent_calls_refresh_token_once(fake):
+    async def run():
+        async with fake_client() as zoho:
+            return await asyncio.gather(
+                *(zoho.get_json("items", {"per_page": 1}) for _ in range(20))
+            )
+
+    responses = asyncio.run(run())
+
+    assert all(r["code"] == 0 for r in responses)
+    assert fake["token_refreshes"] == 1
+
+
+def test_rejected_token_is_refreshed_once_and_retried(fake):
+    async def run():
+        async with fake_client() as zoho:
+            await zoho.get_json("organizations")
+            await zoho.http.post("http://zoho.test/_expire")
+            return await asyncio.gather(
+                *(zoho.request("GET", "organizations") for _ in range(10))
+            )
+
+    responses = asyncio.run(run())
+
+    assert [r.status_code for r in responses] == [200] * 10
+    assert fake["token_refreshes"] == 2
+
+
+def test_token_file_is_shared_between_clients(tmp_path, fake):
+    token_file = tmp_path / "zoho_token.json"
+
+    async def run():
+        for _ in range(3):
+            async with fake_client(token_file=str(token_file)) as zoho:
+                await zoho.get_json("organizations")
+
+    asyncio.run(run())
+
+    assert fake["token_refreshes"] == 1
+
+
+# ==========================================
+# ORDER OUTBOX
+# ==========================================
+
+def order_payload() -> dict:
+    item = fake_zoho.ITEMS[0]
+    return {
+        "cart_items": [{"sku": item["sku"], "quantity": 1, "price": 10.0,
+                        "name": item["name"], "item_id": item["item_id"]}],
+        "customer_info": {"email": "shopper@example.com", "name": "Test Shopper"},
+        "shipping_method": "standard",
+        "shipping_charge": 0,
+    }
+
+
+def test_outbox_returns_same_reference_for_repeated_payment_intent(tmp_path):
+    outbox = OrderOutbox(tmp_path / "orders.db")
+
+    first = outbox.enqueue(order_payload(), 10.0, 0, 10.0, payment_intent_id="pi_123")
+    again = outbox.enqueue(order_payload(), 10.0, 0, 10.0, payment_intent_id="pi_123")
+    other = outbox.enqueue(order_payload(), 10.0, 0, 10.0, payment_intent_id="pi_456")
+
+    assert again["reference"] == first["reference"]
+    assert other["reference"] != first["reference"]
+    outbox.close()
+
+
+def test_outbox_answers_repeated_payment_intent_with_submitted_order(tmp_path, fake, monkeypatch):
+    if not fake_zoho.ITEMS:
+        pytest.skip("needs data/products.json")
+    outbox = OrderOutbox(tmp_path / "orders.db")
+    monkeypatch.setattr(zoho_orders, "customers", CustomerCache(tmp_path / "customers.db"))
+
+    async def run():
+        async with fake_client() as zoho:
+            monkeypatch.setattr(zoho_orders, "zoho", zoho)
+            placed = outbox.enqueue(order_payload(), 10.0, 0, 10.0, payment_intent_id="pi_123")
+            while (order := outbox.claim()) is not None:
+                await outbox.submit(order)
+            return placed, outbox.enqueue(order_payload(), 10.0, 0, 10.0,
+                                          payment_intent_id="pi_123")
+
+    placed, again = asyncio.run(run())
+
+    assert again["reference"] == placed["reference"]
+    assert again["status"] == SUBMITTED
+    assert again["salesorder_number"] == "SO-00001"
+    assert len(fake["salesorders"]) == 1
+    outbox.close()
+
+
+class Crash(Exception):
+    """The worker dying between two steps"""
+
+
+@pytest.mark.parametrize("lost", ["crash before mark_submitted", "reply lost"])
+def test_outbox_retry_finds_order_zoho_already_created(tmp_path, fake, monkeypatch, lost):
+    if not fake_zoho.ITEMS:
+        pytest.skip("needs data/products.json")
+    outbox = OrderOutbox(tmp_path / "orders.db")
+    monkeypatch.setattr(zoho_orders, "customers", CustomerCache(tmp_path / "customers.db"))
+    # Retry at once: take over claims and skip the backoff
+    monkeypatch.setattr(order_outbox, "ORDER_CLAIM_TIMEOUT", 0)
+    monkeypatch.setattr(order_outbox, "ORDER_RETRY_BASE", 0)
+
+    # Only the first attempt fails, after Zoho has created the sales order
+    if lost == "crash before mark_submitted":
+        # The row stays claimed (submitting)
+        def mark_submitted(reference, result):
+            del outbox.mark_submitted
+            raise Crash()
+        outbox.mark_submitted = mark_submitted
+    else:
+        # The reply never arrives (the row goes back to queued)
+        calls = []
+
+        async def create_then_time_out(**kwargs):
+            result = await zoho_orders.create_order_from_cart(**kwargs)
+            calls.append(result)
+            if len(calls) == 1:
+                raise httpx.ReadTimeout("reply lost")
+            return result
+        monkeypatch.setattr(order_outbox, "create_order_from_cart", create_then_time_out)
+
+    async def run():
+        async with fake_client() as zoho:
+            monkeypatch.setattr(zoho_orders, "zoho", zoho)
+            placed = outbox.enqueue(order_payload(), 10.0, 0, 10.0, payment_intent_id="pi_123")
+            try:
+                await outbox.submit(outbox.claim())
+            except Crash:
+                pass
+            assert len(fake["salesorders"]) == 1
+
+            retry = outbox.claim()
+            assert retry["reference"] == placed["reference"]
+            assert retry["attempts"] == 2
+            await outbox.submit(retry)
+            return outbox.get(placed["reference"])
+
+    order = asyncio.run(run())
+
+    assert order["status"] == SUBMITTED
+    assert order["salesorder_number"] == "SO-00001"
+    assert len(fake["salesorders"]) == 1
+    outbox.close()
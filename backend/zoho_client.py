@@ -0,0 +1,305 @@
+"""
+Home & Verse - Zoho Client
+===========================
+One Zoho Inventory client per process, shared by the API (zoho_orders.py)
+and the import/bestsellers/brand-check scripts.
+
+- One httpx.AsyncClient for the life of the process: keep-alive connection
+  pool, HTTP/2 when the `h2` package is installed, so calls after the
+  first skip the TLS handshake to zohoapis.eu.
+- The OAuth access token is cached and refreshed single-flight: when it
+  expires, one coroutine refreshes it and the others await that refresh
+  instead of each posting to accounts.zoho.eu.
+- The token is persisted to ZOHO_TOKEN_FILE and refreshes take a host-wide
+  flock, so uvicorn workers (and the scripts) share one token: a worker
+  whose token is stale first adopts a newer one another process wrote,
+  and only mints its own if there is none.
+- `start_renewal()` (the API lifespan) renews the token TOKEN_RENEW_AHEAD
+  seconds before it expires, in the background, so checkouts never wait
+  on an OAuth round trip.
+- A 401 (token revoked early) drops the cached token and retries once.
+- Timeouts and pool size come from the environment. ZOHO_ACCOUNTS_URL and
+  ZOHO_API_URL point the client at another server, e.g. fake_zoho.py.
+
+Usage:
+    from zoho_client import zoho
+    response = await zoho.request("GET", "items", params={"sku": sku})
+    data = await zoho.get_json("salesorders", {"page": 1})
+"""
+
+import asyncio
+import fcntl
+import json
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ZOHO_ACCOUNTS_URL = os.getenv("ZOHO_ACCOUNTS_URL", "https://accounts.zoho.eu")
+ZOHO_API_URL = os.getenv("ZOHO_API_URL", "https://www.zohoapis.eu/inventory/v1")
+
+# Seconds - read/write/pool use ZOHO_TIMEOUT, connecting uses ZOHO_CONNECT_TIMEOUT
+ZOHO_TIMEOUT = float(os.getenv("ZOHO_TIMEOUT", "30"))
+ZOHO_CONNECT_TIMEOUT = float(os.getenv("ZOHO_CONNECT_TIMEOUT", "10"))
+
+ZOHO_MAX_CONNECTIONS = int(os.getenv("ZOHO_MAX_CONNECTIONS", "20"))
+ZOHO_KEEPALIVE_EXPIRY = float(os.getenv("ZOHO_KEEPALIVE_EXPIRY", "60"))
+
+# Refresh this many seconds before Zoho says the token expires
+TOKEN_EXPIRY_MARGIN = 60
+
+# Background renewal starts this many seconds before expiry
+TOKEN_RENEW_AHEAD = float(os.getenv("ZOHO_TOKEN_RENEW_AHEAD", "300"))
+
+# Retry delay (seconds) after a failed background renewal, and the
+# shortest gap between renewals
+TOKEN_RENEW_RETRY = 30
+
+# Where the current token is shared between processes ("" = not persisted)
+ZOHO_TOKEN_FILE = os.getenv("ZOHO_TOKEN_FILE", "data/zoho_token.json")
+
+try:
+    import h2  # noqa: F401 - enables HTTP/2 in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:  # HTTP/1.1 keep-alive until h2 is installed
+    HTTP2_AVAILABLE = False
+
+
+class ZohoClient:
+    """Pooled, authenticated client for the Zoho Inventory API"""
+
+    def __init__(self, client_id: Optional[str], client_secret: Optional[str],
+                 refresh_token: Optional[str], org_id: Optional[str],
+                 api_url: str = ZOHO_API_URL, accounts_url: str = ZOHO_ACCOUNTS_URL,
+                 timeout: float = ZOHO_TIMEOUT, token_file: Optional[str] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refresh_token = refresh_token
+        self.org_id = org_id
+        self.api_url = api_url.rstrip("/")
+        self.accounts_url = accounts_url.rstrip("/")
+        self.timeout = httpx.Timeout(timeout, connect=ZOHO_CONNECT_TIMEOUT)
+        self._http: Optional[httpx.AsyncClient] = None
+        self.token_file = Path(token_file) if token_file else None
+        self.transport = transport  # e.g. httpx.ASGITransport(app=fake_zoho.app)
+        self._token: Optional[str] = None
+        self._token_expires = 0.0    # Zoho's expiry time, not including the margin
+        self._rejected: Optional[str] = None
+        self._refresh_lock = asyncio.Lock()
+        self._renewal: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls) -> "ZohoClient":
+        return cls(
+            os.getenv("ZOHO_CLIENT_ID"),
+            os.getenv("ZOHO_CLIENT_SECRET"),
+            os.getenv("ZOHO_REFRESH_TOKEN"),
+            os.getenv("ZOHO_ORG_ID"),
+            token_file=ZOHO_TOKEN_FILE,
+        )
+
+    @property
+    def configured(self) -> bool:
+        """All credentials present"""
+        return all([self.client_id, self.client_secret, self.refresh_token, self.org_id])
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """The shared connection pool (created on first use)"""
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                transport=self.transport,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=ZOHO_MAX_CONNECTIONS,
+                    max_keepalive_connections=ZOHO_MAX_CONNECTIONS,
+                    keepalive_expiry=ZOHO_KEEPALIVE_EXPIRY,
+                ),
+            )
+        return self._http
+
+    async def aclose(self):
+        """Stop renewal and close the pool (app shutdown / end of a script)"""
+        await self.stop_renewal()
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        self._refresh_lock = asyncio.Lock()
+
+    async def __aenter__(self) -> "ZohoClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    # ==========================================
+    # AUTH
+    # ==========================================
+
+    def _token_valid(self, min_remaining: float = TOKEN_EXPIRY_MARGIN) -> bool:
+        return self._token is not None and time.time() + min_remaining < self._token_expires
+
+    async def access_token(self) -> str:
+        """Cached access token, refreshed by one coroutine at a time"""
+        if self._token_valid():
+            return self._token
+        return await self._refresh(TOKEN_EXPIRY_MARGIN)
+
+    async def _refresh(self, min_remaining: float) -> str:
+        """
+        Make sure the token has at least `min_remaining` seconds left:
+        adopt the shared one if it does, otherwise mint a new one.
+        """
+        async with self._refresh_lock:
+            # Another coroutine (or process) may have refreshed while we waited
+            if self._token_valid(min_remaining) or self._adopt_shared(min_remaining):
+                return self._token
+
+            lock_fd = await asyncio.to_thread(self._lock_shared)
+            try:
+                if self._adopt_shared(min_remaining):
+                    return self._token
+                await self._mint_token()
+                return self._token
+            finally:
+                if lock_fd is not None:
+                    os.close(lock_fd)  # releases the flock
+
+    async def _mint_token(self):
+        response = await self.http.post(
+            f"{self.accounts_url}/oauth/v2/token",
+            params={
+                "refresh_token": self.refresh_token,
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+                "grant_type": "refresh_token"
+            }
+        )
+        response.raise_for_status()
+        data = response.json()
+        if "access_token" not in data:
+            raise RuntimeError(f"Zoho token refresh failed: {data.get('error', data)}")
+
+        self._token = data["access_token"]
+        self._token_expires = time.time() + data.get("expires_in", 3600)
+        self._rejected = None
+        self._write_shared()
+
+    def invalidate_token(self, token: str):
+        """Forget a token Zoho rejected (unless it was already replaced)"""
+        if self._token == token:
+            self._token = None
+            self._token_expires = 0.0
+        # Don't adopt it back from the token file either
+        self._rejected = token
+
+    # ==========================================
+    # SHARED TOKEN FILE
+    # ==========================================
+
+    def _lock_shared(self) -> Optional[int]:
+        """Block until this process holds the host-wide refresh lock"""
+        if self.token_file is None:
+            return None
+        self.token_file.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.token_file.with_name(self.token_file.name + ".lock"),
+                     os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        return fd
+
+    def _adopt_shared(self, min_remaining: float) -> bool:
+        """Take the persisted token if it is newer than ours and still good"""
+        if self.token_file is None:
+            return False
+        try:
+            with open(self.token_file) as f:
+                shared = json.load(f)
+            token, expires = shared["access_token"], float(shared["expires_at"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        if token == self._rejected or time.time() + min_remaining >= expires:
+            return False
+        self._token, self._token_expires = token, expires
+        return True
+
+    def _write_shared(self):
+        if self.token_file is None:
+            return
+        tmp = self.token_file.with_name(self.token_file.name + ".tmp")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump({"access_token": self._token, "expires_at": self._token_expires}, f)
+        os.replace(tmp, self.token_file)
+
+    # ==========================================
+    # BACKGROUND RENEWAL
+    # ==========================================
+
+    def start_renewal(self):
+        """Renew the token ahead of expiry from a background task"""
+        if self._renewal is None and self.configured:
+            self._renewal = asyncio.create_task(self._renew())
+
+    async def stop_renewal(self):
+        if self._renewal is not None:
+            self._renewal.cancel()
+            try:
+                await self._renewal
+            except asyncio.CancelledError:
+                pass
+            self._renewal = None
+
+    async def _renew(self):
+        while True:
+            try:
+                await self._refresh(TOKEN_RENEW_AHEAD)
+                delay = self._token_expires - TOKEN_RENEW_AHEAD - time.time()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Zoho token renewal failed: {e}")
+                delay = TOKEN_RENEW_RETRY
+            await asyncio.sleep(max(delay, TOKEN_RENEW_RETRY))
+
+    # ==========================================
+    # REQUESTS
+    # ==========================================
+
+    async def request(self, method: str, endpoint: str, params: dict = None,
+                      json: dict = None, timeout: Optional[float] = None) -> httpx.Response:
+        """Authenticated request to the Inventory API (organization_id added)"""
+        params = {**(params or {}), "organization_id": self.org_id}
+        kwargs = {"params": params, "json": json}
+        if timeout is not None:
+            kwargs["timeout"] = httpx.Timeout(timeout, connect=ZOHO_CONNECT_TIMEOUT)
+
+        for attempt in range(2):
+            token = await self.access_token()
+            response = await self.http.request(
+                method,
+                f"{self.api_url}/{endpoint}",
+                headers={"Authorization": f"Zoho-oauthtoken {token}"},
+                **kwargs
+            )
+            if response.status_code != 401 or attempt:
+                return response
+            self.invalidate_token(token)
+        return response
+
+    async def get_json(self, endpoint: str, params: dict = None,
+                       timeout: Optional[float] = None) -> dict:
+        """GET an endpoint and return its JSON (raises on HTTP errors)"""
+        response = await self.request("GET", endpoint, params=params, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+
+# Process-wide client
+zoho = ZohoClient.from_env()
@@ -4,93 +4,48 @@ Zoho Inventory Integration for Orders
 Creates Sales Orders, manages customers, and syncs with Zoho.
 """
 
-import httpx
-import os
-from datetime import datetime
-from dotenv import load_dotenv
+import asyncio
 
-load_dotenv()
-
-ZOHO_CLIENT_ID = os.getenv("ZOHO_CLIENT_ID")
-ZOHO_CLIENT_SECRET = os.getenv("ZOHO_CLIENT_SECRET")
-ZOHO_REFRESH_TOKEN = os.getenv("ZOHO_REFRESH_TOKEN")
-ZOHO_ORG_ID = os.getenv("ZOHO_ORG_ID")
-
-# Token cache
-_access_token = None
-_token_expires = None
+from customer_cache import MISS, NOT_FOUND, customers
+from zoho_client import zoho
 
 
 async def get_access_token():
     """Get or refresh Zoho access token"""
-    global _access_token, _token_expires
-    
-    if _access_token and _token_expires and datetime.now().timestamp() < _token_expires:
-        return _access_token
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            "https://accounts.zoho.eu/oauth/v2/token",
-            params={
-                "refresh_token": ZOHO_REFRESH_TOKEN,
-                "client_id": ZOHO_CLIENT_ID,
-                "client_secret": ZOHO_CLIENT_SECRET,
-                "grant_type": "refresh_token"
-            }
-        )
-        response.raise_for_status()
-        data = response.json()
-        
-        _access_token = data["access_token"]
-        _token_expires = datetime.now().timestamp() + data.get("expires_in", 3600) - 60
-        
-        return _access_token
+    return await zoho.access_token()
 
 
 async def zoho_request(method: str, endpoint: str, data: dict = None, params: dict = None):
-    """Make authenticated request to Zoho"""
-    token = await get_access_token()
-    
-    if params is None:
-        params = {}
-    params["organization_id"] = ZOHO_ORG_ID
-    
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        if method == "GET":
-            response = await client.get(
-                f"https://www.zohoapis.eu/inventory/v1/{endpoint}",
-                headers={"Authorization": f"Zoho-oauthtoken {token}"},
-                params=params
-            )
-        elif method == "POST":
-            response = await client.post(
-                f"https://www.zohoapis.eu/inventory/v1/{endpoint}",
-                headers={
-                    "Authorization": f"Zoho-oauthtoken {token}",
-                    "Content-Type": "application/json"
-                },
-                params=params,
-                json=data
-            )
-        else:
-            raise ValueError(f"Unsupported method: {method}")
-        
-        return response
+    """Make authenticated request to Zoho (over the shared connection pool)"""
+    if method not in ("GET", "POST"):
+        raise ValueError(f"Unsupported method: {method}")
+    return await zoho.request(method, endpoint, params=params, json=data)
 
 
 async def find_or_create_customer(email: str, name: str, phone: str = None, 
                                    billing_address: dict = None, shipping_address: dict = None):
     """Find existing customer by email or create new one"""
     
-    # Search for existing customer
-    response = await zoho_request("GET", "contacts", params={"email": email})
+    # Returning customers come from the local cache; a recent "not found"
+    # skips the search too. SQLite can wait on another worker's write lock,
+    # so the cache is used from the threadpool.
+    cached = await asyncio.to_thread(customers.get, email)
+    if cached not in (MISS, NOT_FOUND):
+        return cached["contact_id"], cached
     
-    if response.status_code == 200:
-        data = response.json()
-        contacts = data.get("contacts", [])
-        if contacts:
-            # Return existing customer
-            return contacts[0]["contact_id"], contacts[0]
+    if cached == MISS:
+        # Search for existing customer
+        response = await zoho_request("GET", "contacts", params={"email": email})
+        
+        if response.status_code == 200:
+            data = response.json()
+            contacts = data.get("contacts", [])
+            if contacts:
+                # Return existing customer
+                await asyncio.to_thread(customers.put, email, contacts[0]["contact_id"],
+                                        contacts[0].get("contact_name"))
+                return contacts[0]["contact_id"], contacts[0]
+            await asyncio.to_thread(customers.put_absent, email)
     
     # Create new customer
     customer_data = {
@@ -108,6 +63,8 @@ async def find_or_create_customer(email: str, name: str, phone: str = None,
     if response.status_code in [200, 201]:
         data = response.json()
         contact = data.get("contact", {})
+        await asyncio.to_thread(customers.put, email, contact.get("contact_id"),
+                                contact.get("contact_name"))
         return contact.get("contact_id"), contact
     else:
         error_msg = response.json().get("message", response.text)
@@ -164,6 +121,27 @@ async def create_sales_order(customer_id: str, line_items: list,
         }
 
 
+async def find_sales_order_by_reference(reference_number: str):
+    """
+    The Sales Order already created with this reference number (Stripe
+    payment intent), in create_sales_order's result format, or None
+    """
+    response = await zoho_request("GET", "salesorders", params={"reference_number": reference_number})
+    response.raise_for_status()
+    
+    for sales_order in response.json().get("salesorders", []):
+        if sales_order.get("reference_number") == reference_number:
+            return {
+                "success": True,
+                "salesorder_id": sales_order.get("salesorder_id"),
+                "salesorder_number": sales_order.get("salesorder_number"),
+                "total": sales_order.get("total"),
+                "status": sales_order.get("status")
+            }
+    
+    return None
+
+
 async def get_item_by_sku(sku: str):
     """Get item details from Zoho by SKU"""
     response = await zoho_request("GET", "items", params={"sku": sku})
@@ -184,14 +162,16 @@ async def create_order_from_cart(cart_items: list, customer_info: dict,
     """
     Full order creation flow:
     1. Find or create customer
-    2. Look up item IDs from SKUs
+    2. Look up item IDs from SKUs (only for items without a local item_id)
     3. Create sales order
     
     cart_items format:
     [
-        {"sku": "ABC123", "quantity": 2, "price": 19.99},
+        {"sku": "ABC123", "quantity": 2, "price": 19.99,
+         "item_id": "310656000000193146", "name": "..."},
         ...
     ]
+    item_id (from the catalog snapshot) and name are optional.
     
     customer_info format:
     {
@@ -218,23 +198,30 @@ async def create_order_from_cart(cart_items: list, customer_info: dict,
             shipping_address=customer_info.get("shipping_address", customer_info.get("address"))
         )
         
-        # 2. Build line items with Zoho item IDs
+        # 2. Build line items with Zoho item IDs - from the local catalog,
+        # asking Zoho (concurrently) only for SKUs it doesn't know
+        missing = [item["sku"] for item in cart_items if not item.get("item_id")]
+        zoho_items = dict(zip(missing, await asyncio.gather(*map(get_item_by_sku, missing))))
+        
         line_items = []
         for cart_item in cart_items:
-            # Look up item in Zoho
-            zoho_item = await get_item_by_sku(cart_item["sku"])
-            
-            if not zoho_item:
-                return {
-                    "success": False,
-                    "error": f"Product not found: {cart_item['sku']}"
-                }
+            item_id = cart_item.get("item_id")
+            name = cart_item.get("name", cart_item["sku"])
+            if not item_id:
+                zoho_item = zoho_items.get(cart_item["sku"])
+                if not zoho_item:
+                    return {
+                        "success": False,
+                        "error": f"Product not found: {cart_item['sku']}"
+                    }
+                item_id = zoho_item["item_id"]
+                name = zoho_item.get("name", name)
             
             line_items.append({
-                "item_id": zoho_item["item_id"],
+                "item_id": item_id,
                 "quantity": cart_item["quantity"],
                 "rate": cart_item["price"],  # Use cart price (retail)
-                "name": zoho_item.get("name", cart_item["sku"])
+                "name": name
             })
         
         # 3. Create sales order
@@ -259,6 +246,9 @@ async def create_order_from_cart(cart_items: list, customer_info: dict,
         if result["success"]:
             result["customer_id"] = customer_id
             result["customer_name"] = customer.get("contact_name")
+        else:
+            # The cached contact may be gone from Zoho - look it up next time
+            await asyncio.to_thread(customers.forget, customer_info["email"])
         
         return result
         